@@ -0,0 +1,180 @@
+import asyncio
+import random
+import threading
+import time
+
+import aiohttp
+from web3 import AsyncWeb3
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0  # starting requests/sec, adapted at runtime
+MIN_RATE = 1.0
+MAX_RATE = 100.0
+MAX_RETRIES = 5
+
+# Substrings of provider errors that mean "slow down" rather than "this call is broken"
+RATE_LIMIT_MARKERS = ("429", "too many requests", "rate limit", "limit exceeded", "-32005")
+
+
+def is_rate_limit_error(error):
+    """Return True for HTTP 429 responses and JSON-RPC rate/limit errors."""
+    if getattr(error, "status", None) == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter with additive increase / multiplicative decrease.
+
+    Successful requests raise the rate by about `increase` req/s for every
+    second of clean traffic; a rate limit error halves it. The bucket holds at
+    most one second of tokens so a raised rate never turns into a burst.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, increase=0.5):
+        if not min_rate <= rate <= max_rate:
+            raise ValueError(f"rate must be between {min_rate} and {max_rate} requests/sec, got {rate}")
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1.0:
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1.0
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+
+    def on_throttled(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+
+
+async def _fetch_token_uri(contract, bucket, semaphore, token_id, token_uris, errors, stats,
+                           max_retries=MAX_RETRIES, block_identifier="latest"):
+    """Fetch one tokenURI into `token_uris` or `errors`, retrying rate limit errors with jittered backoff."""
+    async with semaphore:
+        for attempt in range(max_retries + 1):
+            await bucket.acquire()
+            stats["requests"] += 1
+            try:
+                token_uris[token_id] = await contract.functions.tokenURI(token_id).call(
+                    block_identifier=block_identifier)
+                bucket.on_success()
+                return
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    errors[token_id] = str(e)
+                    return
+                stats["throttled"] += 1
+                stats["retries"] += 1
+                bucket.on_throttled()
+                await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt) * (1 + random.random()))
+
+
+def _async_http_provider(rpc_url):
+    """AsyncHTTPProvider that retries connection errors itself but leaves HTTP 429s to the token bucket."""
+    retried = (aiohttp.ClientConnectionError, TimeoutError)
+    try:
+        from web3.providers.rpc.utils import ExceptionRetryConfiguration
+    except ImportError:
+        # web3 6 retries every aiohttp error, 429s included, in a provider middleware
+        from web3.middleware.exception_retry_request import async_exception_retry_middleware
+
+        async def retry_connection_errors(make_request, async_w3):
+            return await async_exception_retry_middleware(make_request, async_w3, retried)
+
+        provider = AsyncWeb3.AsyncHTTPProvider(rpc_url)
+        provider.middlewares = [retry_connection_errors]
+        return provider
+    return AsyncWeb3.AsyncHTTPProvider(rpc_url, exception_retry_configuration=ExceptionRetryConfiguration(
+        errors=retried))
+
+
+class ConcurrentFetcher:
+    """The asyncio engine kept running across many fetches.
+
+    An event loop in a background thread owns one AsyncWeb3 session, one
+    token bucket and one semaphore bounding the requests in flight. The rate
+    learned from 429s and the keep-alive connections therefore carry over
+    from one batch to the next, and batches submitted back to back share the
+    concurrency limit instead of each waiting for its own slowest request.
+    The session counts the HTTP body bytes it sends and receives into
+    `totals`.
+    """
+
+    def __init__(self, rpc_url, contract_address, contract_abi, concurrency=DEFAULT_CONCURRENCY,
+                 rate=DEFAULT_RATE, max_retries=MAX_RETRIES):
+        self.bucket = TokenBucket(rate=rate)
+        self.max_retries = max_retries
+        self.totals = {"requests": 0, "throttled": 0, "retries": 0, "tokens": 0, "request_bytes": 0,
+                       "response_bytes": 0}
+        self.started = time.monotonic()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.w3 = AsyncWeb3(_async_http_provider(rpc_url))
+        self.contract = self.w3.eth.contract(address=contract_address, abi=contract_abi)
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.session = asyncio.run_coroutine_threadsafe(self._open_session(), self.loop).result()
+
+    async def _open_session(self):
+        trace = aiohttp.TraceConfig()
+        trace.on_request_chunk_sent.append(self._on_request_chunk)
+        trace.on_response_chunk_received.append(self._on_response_chunk)
+        # raise_for_status as in web3's own session, so 429s raise ClientResponseError
+        session = aiohttp.ClientSession(raise_for_status=True, trace_configs=[trace])
+        return await self.w3.provider.cache_async_session(session)
+
+    async def _on_request_chunk(self, session, context, params):
+        self.totals["request_bytes"] += len(params.chunk)
+
+    async def _on_response_chunk(self, session, context, params):
+        self.totals["response_bytes"] += len(params.chunk)
+
+    async def _fetch(self, token_ids, block_identifier):
+        token_uris, errors = {}, {}
+        stats = {"requests": 0, "throttled": 0, "retries": 0}
+        await asyncio.gather(*(_fetch_token_uri(self.contract, self.bucket, self.semaphore, token_id, token_uris,
+                                                errors, stats, self.max_retries, block_identifier)
+                               for token_id in token_ids))
+        for key, value in stats.items():
+            self.totals[key] += value
+        self.totals["tokens"] += len(token_ids)
+        return token_uris, errors, stats
+
+    def submit(self, token_ids, block_identifier="latest"):
+        """Start fetching; returns a concurrent.futures.Future of (token_uris, errors, stats)."""
+        return asyncio.run_coroutine_threadsafe(self._fetch(list(token_ids), block_identifier), self.loop)
+
+    def fetch(self, token_ids, block_identifier="latest"):
+        return self.submit(token_ids, block_identifier).result()
+
+    def close(self):
+        """Close the HTTP session and stop the loop, printing the throughput over all fetches."""
+        disconnect = getattr(self.w3.provider, "disconnect", None)
+        if disconnect is not None:
+            asyncio.run_coroutine_threadsafe(disconnect(), self.loop).result()
+        if not self.session.closed:
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        elapsed = time.monotonic() - self.started
+        print(f"\nFetched {self.totals['tokens']} tokenURIs in {elapsed:.1f}s "
+              f"({self.totals['requests'] / elapsed if elapsed > 0 else 0.0:.1f} req/s, "
+              f"{self.totals['throttled']} throttled, final rate {self.bucket.rate:.1f} req/s)")
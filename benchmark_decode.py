@@ -0,0 +1,110 @@
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import time
+import tracemalloc
+
+from get_buterin_token_uris.decode import get_token_metadata
+from stream_decode import decode_token_uri_streaming
+
+FIXTURES_DIR = os.path.join("fixtures", "token_uris")
+
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """Load recorded tokenURIs as {token_id: token_uri} from <token_id>.txt files."""
+    fixtures = {}
+    if not os.path.isdir(fixtures_dir):
+        return fixtures
+    for filename in sorted(os.listdir(fixtures_dir)):
+        token_id, ext = os.path.splitext(filename)
+        if ext == ".txt" and token_id.isdigit():
+            with open(os.path.join(fixtures_dir, filename), 'r', encoding='utf-8') as f:
+                fixtures[int(token_id)] = f.read()
+    return fixtures
+
+
+def record_fixtures(token_ids, fixtures_dir=FIXTURES_DIR):
+    """Fetch tokenURIs from the chain and save them as fixtures."""
+    from get_buterin_token_uris import w3, contract
+    from multicall import fetch_token_uris
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    token_uris, errors = fetch_token_uris(w3, contract, token_ids)
+    for token_id, token_uri in token_uris.items():
+        with open(os.path.join(fixtures_dir, f"{token_id}.txt"), 'w', encoding='utf-8') as f:
+            f.write(token_uri)
+    for token_id, error in errors.items():
+        print(f"Could not record token {token_id}: {error}")
+    print(f"Recorded {len(token_uris)} tokenURIs to {fixtures_dir}")
+
+
+def synthetic_fixtures(count, image_kb=256):
+    """Build tokenURIs shaped like the cards' (embedded JPEG and HTML animation) for offline runs."""
+    fixtures = {}
+    for token_id in range(count):
+        jpeg = os.urandom(image_kb * 1024)
+        metadata = {
+            "name": f"Buterin Card #{token_id}",
+            "description": "Synthetic card used for decoder benchmarks. " * 10,
+            "image": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode(),
+            "animation_url": "data:text/html;base64," + base64.b64encode(b"<html>" + jpeg[:4096] + b"</html>").decode(),
+            "attributes": [
+                {"trait_type": "Quote Title", "value": f"Quote {token_id % 50}"},
+                {"trait_type": "Background Palette", "value": token_id % 7},
+                {"trait_type": "Background Direction", "value": token_id % 4},
+                {"trait_type": "Icons", "value": token_id % 9},
+            ],
+        }
+        fixtures[token_id] = "data:application/json;base64," + base64.b64encode(json.dumps(metadata).encode()).decode()
+    return fixtures
+
+
+def measure(decode, fixtures, repeat):
+    """Return (best total seconds over `repeat` runs, peak traced bytes for a single token, results)."""
+    best = float("inf")
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for token_id, token_uri in fixtures.items():
+                results[token_id] = decode(token_id, token_uri=token_uri)[1]
+            best = min(best, time.perf_counter() - started)
+
+        peak = 0
+        for token_id, token_uri in fixtures.items():
+            tracemalloc.start()
+            decode(token_id, token_uri=token_uri)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return best, peak, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare get_token_metadata with the streaming tokenURI decoder")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help=f"Directory of recorded tokenURIs (default: {FIXTURES_DIR})")
+    parser.add_argument("--record", type=int, metavar="N", help="Record the tokenURIs of tokens 0..N-1 first")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="Benchmark N synthetic tokenURIs instead of fixtures")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs, best one is reported (default: 5)")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(range(args.record), args.fixtures)
+    fixtures = synthetic_fixtures(args.synthetic) if args.synthetic else load_fixtures(args.fixtures)
+    if not fixtures:
+        raise SystemExit(f"No fixtures in {args.fixtures}; use --record N or --synthetic N")
+
+    total_chars = sum(len(token_uri) for token_uri in fixtures.values())
+    print(f"Decoding {len(fixtures)} tokenURIs ({total_chars / 1024 / 1024:.1f} MiB), best of {args.repeat}")
+
+    baseline = measure(get_token_metadata, fixtures, args.repeat)
+    streaming = measure(decode_token_uri_streaming, fixtures, args.repeat)
+    for label, (seconds, peak, _) in (("get_token_metadata", baseline), ("streaming", streaming)):
+        print(f"{label:>20}: {seconds * 1000 / len(fixtures):8.2f} ms/token, peak {peak / 1024:10.1f} KiB/token")
+
+    mismatches = [token_id for token_id in fixtures if baseline[2][token_id] != streaming[2][token_id]]
+    print(f"Results identical for {len(fixtures) - len(mismatches)}/{len(fixtures)} tokens")
+    if mismatches:
+        print(f"Mismatching tokens: {mismatches[:20]}")
@@ -0,0 +1,231 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from web3 import Web3
+
+from benchmark_decode import FIXTURES_DIR, load_fixtures, synthetic_fixtures
+from get_buterin_token_uris.decode import get_token_metadata
+from standin_node import StandInNode
+from stream_decode import decode_token_uri_streaming
+
+BENCHMARK_BASELINE = "benchmark_baseline.json"
+COLLECTION_SIZE = 2015  # store/export/index benchmarks replicate the fixtures up to the full collection
+REGRESSION_THRESHOLD = 0.25  # a median this much slower than the baseline fails --compare
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register `setup(fixtures, results, tmp)` returning (run, items per run) under `name`."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("decode.reference")
+def bench_decode_reference(fixtures, results, tmp):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for token_id, token_uri in fixtures.items():
+                get_token_metadata(token_id, token_uri=token_uri)
+    return run, len(fixtures)
+
+
+@benchmark("decode.streaming")
+def bench_decode_streaming(fixtures, results, tmp):
+    def run():
+        for token_id, token_uri in fixtures.items():
+            decode_token_uri_streaming(token_id, token_uri)
+    return run, len(fixtures)
+
+
+@benchmark("fetch.multicall")
+def bench_fetch_multicall(fixtures, results, tmp):
+    from multicall import fetch_token_uris
+
+    w3 = Web3(StandInNode(fixtures))
+    abi = [{"inputs": [{"name": "tokenId", "type": "uint256"}], "name": "tokenURI",
+            "outputs": [{"name": "", "type": "string"}], "stateMutability": "view", "type": "function"}]
+    contract = w3.eth.contract(address=Web3.to_checksum_address("0x5726c14663a1ead4a7d320e8a653c9710b2a2e89"),
+                               abi=abi)
+    token_ids = sorted(fixtures)
+
+    def run():
+        token_uris, errors = fetch_token_uris(w3, contract, token_ids, block_identifier=1)
+        assert not errors and len(token_uris) == len(token_ids)
+    return run, len(token_ids)
+
+
+@benchmark("store.put")
+def bench_store_put(fixtures, results, tmp):
+    from result_store import ResultStore
+
+    batches = [dict(list(results.items())[start:start + 50]) for start in range(0, len(results), 50)]
+    runs = iter(range(sys.maxsize))
+
+    def run():
+        with ResultStore(os.path.join(tmp, f"put_{next(runs)}.db")) as store:
+            for batch in batches:
+                store.put(batch)
+    return run, len(results)
+
+
+def _filled_store(results, tmp):
+    from result_store import ResultStore
+
+    store = ResultStore(os.path.join(tmp, "filled.db"))
+    if len(store) != len(results):
+        store.put(results)
+    return store
+
+
+@benchmark("store.quote_mapping")
+def bench_store_quote_mapping(fixtures, results, tmp):
+    store = _filled_store(results, tmp)
+    return store.quote_mapping, len(results)
+
+
+@benchmark("export.all_formats")
+def bench_export(fixtures, results, tmp):
+    from exporter import WRITERS, export
+
+    store = _filled_store(results, tmp)
+    outputs = {fmt: os.path.join(tmp, f"export.{fmt}") for fmt in WRITERS}
+    return lambda: export(store.quote_rows(), outputs), len(results)
+
+
+@benchmark("index.build")
+def bench_index_build(fixtures, results, tmp):
+    from quote_index import TraitIndex
+
+    return lambda: TraitIndex.build(results.items()).save(os.path.join(tmp, "index.bin")), len(results)
+
+
+@benchmark("index.query")
+def bench_index_query(fixtures, results, tmp):
+    from quote_index import TraitIndex
+
+    path = os.path.join(tmp, "query_index.bin")
+    TraitIndex.build(results.items()).save(path)
+    index = TraitIndex.load(path)
+    queries = [[(trait_type, value)] for trait_type in index.traits() for value in index.values(trait_type)]
+
+    def run():
+        for conditions in queries:
+            index.query_pairs(conditions)
+    return run, len(queries)
+
+
+def collection_results(fixtures, size=COLLECTION_SIZE):
+    """Decode the fixtures once and replicate them into {token_id: result} for `size` tokens."""
+    decoded = [decode_token_uri_streaming(token_id, token_uri)[1] for token_id, token_uri in sorted(fixtures.items())]
+    return {token_id: dict(decoded[token_id % len(decoded)], token_id=token_id) for token_id in range(size)}
+
+
+def measure(run, items, rounds, warmup=1):
+    for _ in range(warmup):
+        run()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        "rounds": rounds,
+        "items": items,
+        "min_s": min(timings),
+        "median_s": median,
+        "mean_s": statistics.fmean(timings),
+        "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "items_per_s": items / median if median else 0.0,
+    }
+
+
+def run_benchmarks(fixtures, names, rounds):
+    """Run the named benchmarks; returns {name: stats}, with {"error": message} for those that failed."""
+    report = {}
+    results = collection_results(fixtures)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            try:
+                run, items = BENCHMARKS[name](fixtures, results, tmp)
+                stats = measure(run, items, rounds)
+            except Exception as e:
+                report[name] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{name:>22}: FAILED ({report[name]['error']})")
+                continue
+            report[name] = stats
+            print(f"{name:>22}: median {stats['median_s'] * 1000:9.2f} ms (min {stats['min_s'] * 1000:9.2f}, "
+                  f"stdev {stats['stdev_s'] * 1000:7.2f}), {stats['items_per_s']:10.0f} items/s")
+    return report
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Return the benchmarks whose median is more than `threshold` slower than in `baseline`.
+
+    Benchmarks that failed are left to the caller; ones new since the baseline are not compared.
+    """
+    regressions = []
+    for name, stats in report.items():
+        before = baseline.get(name, {})
+        if "median_s" not in stats or "median_s" not in before:
+            continue
+        change = stats["median_s"] / before["median_s"] - 1
+        marker = "REGRESSION" if change > threshold else ""
+        print(f"{name:>22}: {change:+7.1%} vs baseline {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the scraper's hot paths")
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR,
+                        help=f"Recorded tokenURIs (default: {FIXTURES_DIR}; record with benchmark_decode.py --record)")
+    parser.add_argument("--synthetic", type=int, default=20, metavar="N",
+                        help="Synthetic tokenURIs to use when there are no recorded fixtures (default: 20)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument("--save", nargs="?", const=BENCHMARK_BASELINE, metavar="PATH",
+                        help=f"Save the results as the baseline (default: {BENCHMARK_BASELINE})")
+    parser.add_argument("--compare", nargs="?", const=BENCHMARK_BASELINE, metavar="PATH",
+                        help="Compare against a saved baseline and exit with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Allowed slowdown of the median before --compare fails (default: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if fixtures:
+        print(f"Using {len(fixtures)} recorded tokenURIs from {args.fixtures}")
+    else:
+        fixtures = synthetic_fixtures(args.synthetic)
+        print(f"No fixtures in {args.fixtures}; using {len(fixtures)} synthetic tokenURIs")
+
+    names = [name for name in BENCHMARKS if not args.keyword or args.keyword in name]
+    report = run_benchmarks(fixtures, names, args.rounds)
+    for path in (args.json, args.save):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {path}")
+    problems = []
+    failed = [name for name, stats in report.items() if "error" in stats]
+    if failed:
+        problems.append(f"Failed: {', '.join(failed)}")
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            problems.append(f"Regressions: {', '.join(regressions)}")
+    if problems:
+        raise SystemExit("; ".join(problems))
@@ -0,0 +1,71 @@
+from eth_utils import event_abi_to_log_topic
+
+LOG_CHUNK_SIZE = 10_000  # blocks per eth_getLogs request
+SYNC_CONFIRMATIONS = 12  # stay this many blocks behind the head so reorgs don't skip events
+
+# Provider errors that mean the block range returned too much and should be split
+TOO_MANY_RESULTS_MARKERS = ("query returned more than", "too many results", "response size exceeded",
+                            "block range", "range is too large", "range too large")
+
+
+def is_too_many_results_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in TOO_MANY_RESULTS_MARKERS)
+
+
+def event_topic(contract_abi, event_name):
+    """Return the 0x-prefixed topic0 hash of an event in `contract_abi`."""
+    for entry in contract_abi:
+        if entry.get("type") == "event" and entry.get("name") == event_name:
+            return "0x" + event_abi_to_log_topic(entry).hex()
+    raise ValueError(f"Event {event_name} not found in contract ABI")
+
+
+def get_logs_range(w3, address, topics, from_block, to_block):
+    """Return all logs in a block range, halving the range whenever the provider says it is too large."""
+    try:
+        return list(w3.eth.get_logs({
+            "address": address,
+            "topics": topics,
+            "fromBlock": from_block,
+            "toBlock": to_block,
+        }))
+    except Exception as e:
+        if from_block >= to_block or not is_too_many_results_error(e):
+            raise
+        middle = (from_block + to_block) // 2
+        print(f"Too many logs in blocks {from_block}-{to_block}, splitting at {middle}")
+        return (get_logs_range(w3, address, topics, from_block, middle)
+                + get_logs_range(w3, address, topics, middle + 1, to_block))
+
+
+def get_logs_chunked(w3, address, topics, from_block, to_block, chunk_size=LOG_CHUNK_SIZE):
+    """Yield all logs of `address` matching `topics` between two blocks (inclusive), one chunk at a time."""
+    for start in range(from_block, to_block + 1, chunk_size):
+        end = min(start + chunk_size - 1, to_block)
+        yield from get_logs_range(w3, address, topics, start, end)
+
+
+def _topic_hex(topic):
+    topic = topic.hex() if isinstance(topic, bytes) else topic
+    return topic[2:] if topic.startswith("0x") else topic
+
+
+def log_token_id(log):
+    """Return the tokenId of a Mined or Transfer log; it is the third indexed argument of both."""
+    return int(_topic_hex(log["topics"][3]), 16)
+
+
+def log_address_topic(log, index):
+    """Return the address stored in indexed topic `index` of a log (e.g. 2 for Transfer's `to`)."""
+    return "0x" + _topic_hex(log["topics"][index])[-40:]
+
+
+def changed_token_ids(w3, contract, from_block, to_block, chunk_size=LOG_CHUNK_SIZE):
+    """Return the sorted IDs of tokens minted or transferred between two blocks (inclusive)."""
+    topics = [[event_topic(contract.abi, "Mined"), event_topic(contract.abi, "Transfer")]]
+    token_ids = set()
+    for log in get_logs_chunked(w3, contract.address, topics, from_block, to_block, chunk_size):
+        token_ids.add(log_token_id(log))
+    return sorted(token_ids)
+
@@ -0,0 +1,229 @@
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import struct
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+QUOTE_MAPPING_CSV = "quote_token_mapping.csv"
+QUOTE_MAPPING_JSONL = "quote_token_mapping.jsonl"
+QUOTE_MAPPING_COLUMNAR = "quote_token_mapping.bin"
+DEFAULT_PATHS = {"csv": QUOTE_MAPPING_CSV, "jsonl": QUOTE_MAPPING_JSONL, "columnar": QUOTE_MAPPING_COLUMNAR}
+
+EXPORT_CHUNK_SIZE = 10_000  # rows read from the source and handed to the writers at a time
+
+COLUMNAR_MAGIC = b"BCQCOL01"
+# magic, row count, quote count, code width in bytes, token_id column offset, code column offset,
+# dictionary offset, dictionary length
+COLUMNAR_HEADER = struct.Struct("<8sIIIQQQQ")
+
+
+class CsvWriter:
+    """quote,token_id rows, the format of the original quote_token_mapping.csv."""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(['quote', 'token_id'])
+
+    def write_rows(self, rows):
+        self.writer.writerows((quote, token_id) for token_id, quote in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter:
+    """One {"token_id": ..., "quote": ...} object per line."""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.encoded_quotes = {}  # quotes repeat, so each is JSON-encoded once
+
+    def _encoded(self, quote):
+        encoded = self.encoded_quotes.get(quote)
+        if encoded is None:
+            encoded = self.encoded_quotes[quote] = json.dumps(quote, ensure_ascii=False)
+        return encoded
+
+    def write_rows(self, rows):
+        self.file.write("".join(f'{{"token_id": {token_id}, "quote": {self._encoded(quote)}}}\n'
+                                for token_id, quote in rows))
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """Dictionary-encoded columnar file: a uint32 token_id column, a quote code column and the quote dictionary.
+
+    Rows only cost 4 bytes plus a 2- or 4-byte code each; the columns are
+    buffered as arrays and written on close.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.token_ids = array("I")
+        self.codes = array("I")
+        self.quote_codes = {}
+
+    def _code(self, quote):
+        code = self.quote_codes.get(quote)
+        if code is None:
+            code = self.quote_codes[quote] = len(self.quote_codes)
+        return code
+
+    def write_rows(self, rows):
+        self.token_ids.extend(token_id for token_id, _ in rows)
+        self.codes.extend(self._code(quote) for _, quote in rows)
+
+    def close(self):
+        codes = array("H", self.codes) if len(self.quote_codes) <= 0xFFFF else self.codes
+        dictionary = json.dumps(list(self.quote_codes), ensure_ascii=False).encode("utf-8")
+        token_offset = COLUMNAR_HEADER.size
+        code_offset = token_offset + len(self.token_ids) * self.token_ids.itemsize
+        dictionary_offset = code_offset + len(codes) * codes.itemsize
+        with open(self.path, 'wb') as f:
+            f.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, len(self.token_ids), len(self.quote_codes), codes.itemsize,
+                                         token_offset, code_offset, dictionary_offset, len(dictionary)))
+            f.write(self.token_ids.tobytes())
+            f.write(codes.tobytes())
+            f.write(dictionary)
+
+
+def read_columnar(path):
+    """Return (token_ids, codes, quotes) from a columnar export; quote of row i is quotes[codes[i]]."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    (magic, rows, _, code_width, token_offset, code_offset,
+     dictionary_offset, dictionary_length) = COLUMNAR_HEADER.unpack_from(data, 0)
+    if magic != COLUMNAR_MAGIC:
+        raise ValueError(f"{path} is not a columnar quote mapping")
+    token_ids = array("I", data[token_offset:token_offset + rows * 4])
+    codes = array("H" if code_width == 2 else "I", data[code_offset:code_offset + rows * code_width])
+    quotes = json.loads(data[dictionary_offset:dictionary_offset + dictionary_length].decode("utf-8"))
+    return token_ids, codes, quotes
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "columnar": ColumnarWriter}
+
+
+def _quote_rows(quote, token_ids):
+    for token_id in sorted(token_ids):
+        yield token_id, quote
+
+
+def rows_from_mapping(quote_mapping):
+    """Yield (token_id, quote) from a {quote: [token IDs]} mapping in token ID order.
+
+    Each quote's list is sorted on its own and the lists are merged lazily,
+    so the mapping is never expanded into one big sorted list of rows.
+    """
+    yield from heapq.merge(*(_quote_rows(quote, token_ids) for quote, token_ids in quote_mapping.items()))
+
+
+def export(rows, outputs, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write (token_id, quote) rows to every {format: path} output in a single pass. Returns the row count.
+
+    Rows are consumed in chunks of `chunk_size`, each chunk handed to every
+    writer before the next one is read.
+    """
+    rows = iter(rows)
+    tmp_paths = {fmt: f"{path}.tmp" for fmt, path in outputs.items()}
+    writers = [WRITERS[fmt](tmp_path) for fmt, tmp_path in tmp_paths.items()]
+    count = 0
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            for writer in writers:
+                writer.write_rows(chunk)
+            count += len(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    for fmt, tmp_path in tmp_paths.items():
+        os.replace(tmp_path, outputs[fmt])
+    return count
+
+
+def legacy_export(mapping_path, csv_path):
+    """The approach of the old json_to_csv.py scripts, kept for the benchmark."""
+    with open(mapping_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    pairs = [(quote, token_id) for quote, token_ids in data.items() for token_id in token_ids]
+    pairs.sort(key=lambda pair: pair[1])
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['quote', 'token_id'])
+        writer.writerows(pairs)
+    return len(pairs)
+
+
+def benchmark(rows, quotes=5000):
+    """Time the legacy JSON -> sorted CSV export against a single-pass store export of all formats."""
+    from result_store import ResultStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Building a synthetic store of {rows} tokens with {quotes} quotes...")
+        store = ResultStore(os.path.join(tmp, "bench.db"))
+        batch = {}
+        for token_id in range(rows):
+            batch[token_id] = {"token_id": token_id, "attributes": {"Quote Title": f"Quote {token_id * 7919 % quotes}"}}
+            if len(batch) == 10_000:
+                store.put(batch)
+                batch = {}
+        store.put(batch)
+        mapping_path = os.path.join(tmp, "mapping.json")
+        with open(mapping_path, 'w', encoding='utf-8') as f:
+            json.dump(store.quote_mapping(), f, indent=2)
+
+        runs = [
+            ("legacy json -> csv", lambda: legacy_export(mapping_path, os.path.join(tmp, "legacy.csv"))),
+            ("store -> csv", lambda: export(store.quote_rows(), {"csv": os.path.join(tmp, "out.csv")})),
+            ("store -> csv+jsonl+columnar", lambda: export(store.quote_rows(), {
+                fmt: os.path.join(tmp, f"out.{fmt}") for fmt in WRITERS})),
+        ]
+        for label, run in runs:
+            started = time.perf_counter()
+            count = run()
+            elapsed = time.perf_counter() - started
+            # Traced separately, tracemalloc slows the run down several times
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:>28}: {elapsed:6.2f}s, {count / elapsed:10.0f} rows/s, peak {peak / 1024 / 1024:7.1f} MiB")
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the quote -> token mapping as CSV, JSONL and/or columnar files")
+    parser.add_argument("--format", nargs="+", choices=sorted(WRITERS), default=["csv"],
+                        help="Formats to write in a single pass (default: csv)")
+    parser.add_argument("--output-dir", default=".", help="Directory for the exported files (default: .)")
+    parser.add_argument("--from-json", metavar="PATH",
+                        help="Read a quote_token_mapping.json instead of the result store")
+    parser.add_argument("--benchmark", type=int, metavar="ROWS",
+                        help="Benchmark the exporter on a synthetic mapping of ROWS tokens and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        raise SystemExit(0)
+
+    outputs = {fmt: os.path.join(args.output_dir, DEFAULT_PATHS[fmt]) for fmt in args.format}
+    if args.from_json:
+        with open(args.from_json, 'r', encoding='utf-8') as f:
+            count = export(rows_from_mapping(json.load(f)), outputs)
+    else:
+        from result_store import ResultStore, RESULTS_DB
+        with ResultStore(RESULTS_DB) as store:
+            count = export(store.quote_rows(), outputs)
+    print(f"Exported {count} quote mappings to {', '.join(outputs.values())}")
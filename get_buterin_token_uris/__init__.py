@@ -0,0 +1,23 @@
+from .client import CONTRACT_ADDRESS, Client, get_client, load_abi
+from .decode import get_token_metadata
+
+# Resolved on first access, so importing the package needs neither web3 nor credentials
+_CLIENT_ATTRIBUTES = {"w3": "w3", "contract": "contract", "BLOCK_IDENTIFIER": "block_identifier",
+                      "RPC_URLS": "rpc_urls", "RPC_CACHE_MODE": "cache_mode"}
+_SCRAPE_ATTRIBUTES = ("fetch_token_batch", "missing_token_ids", "process_tokens", "build_quote_mapping_from_results",
+                      "main", "OUTPUT_FILE", "BATCH_SIZE")
+
+
+def __getattr__(name):
+    if name in _CLIENT_ATTRIBUTES:
+        return getattr(get_client(), _CLIENT_ATTRIBUTES[name])
+    if name == "CONTRACT_ABI":
+        return load_abi()
+    if name in _SCRAPE_ATTRIBUTES:
+        from . import scrape
+        return getattr(scrape, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *_CLIENT_ATTRIBUTES, "CONTRACT_ABI", *_SCRAPE_ATTRIBUTES])
@@ -0,0 +1,3 @@
+from .scrape import main
+
+main()
@@ -0,0 +1,72 @@
+import functools
+import json
+import os
+import threading
+
+CONTRACT_ADDRESS = "0x5726C14663A1EaD4A7D320E8A653c9710b2A2E89"
+ABI_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "contract_abi.json")
+
+
+@functools.lru_cache(maxsize=None)
+def load_abi():
+    """Return the Buterin Cards contract ABI, parsed on first use."""
+    with open(ABI_FILE, 'r') as f:
+        return json.load(f)
+
+
+def rpc_urls_from_env(value, default_url=None):
+    """Split a comma-separated RPC_URLS value, falling back to `default_url`."""
+    urls = [url.strip() for url in (value or "").split(",") if url.strip()]
+    if not urls and default_url:
+        urls = [default_url]
+    return urls
+
+
+class Client:
+    """Connection settings read from the environment, with web3 imported and the contract built on first use.
+
+    Creating a client never needs credentials; accessing `w3` or `contract`
+    without INFURA_PROJECT_ID or RPC_URLS (outside RPC cache replay) raises.
+    """
+
+    def __init__(self, rpc_urls=None, cache_mode=None):
+        self.cache_mode = cache_mode or os.getenv('RPC_CACHE_MODE', 'off')  # off, record or replay (see rpc_cache.py)
+        infura_project_id = os.getenv('INFURA_PROJECT_ID')
+        infura_url = f"https://mainnet.infura.io/v3/{infura_project_id}" if infura_project_id else None
+        # Comma-separated endpoints shared by a provider pool (see provider_pool.py); defaults to Infura
+        self.rpc_urls = rpc_urls if rpc_urls is not None else rpc_urls_from_env(os.getenv('RPC_URLS'), infura_url)
+        self._w3 = None
+        self._contract = None
+        self._lock = threading.Lock()
+
+    @functools.cached_property
+    def block_identifier(self):
+        """PINNED_BLOCK as an int, or "latest"; set it for reproducible, cacheable runs."""
+        from rpc_cache import pinned_block_from_env
+        return pinned_block_from_env()
+
+    @property
+    def w3(self):
+        with self._lock:
+            if self._w3 is None:
+                if not self.rpc_urls and self.cache_mode != "replay":
+                    raise ValueError("Set INFURA_PROJECT_ID or RPC_URLS")
+                from web3 import Web3
+                from rpc_cache import provider_from_env
+                self._w3 = Web3(provider_from_env(self.rpc_urls))
+            return self._w3
+
+    @property
+    def contract(self):
+        if self._contract is None:
+            self._contract = self.w3.eth.contract(address=CONTRACT_ADDRESS, abi=load_abi())
+        return self._contract
+
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """Return the shared client, loading .env the first time."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Client()
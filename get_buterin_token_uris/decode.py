@@ -0,0 +1,71 @@
+import base64
+import json
+import urllib.parse
+
+
+def get_token_metadata(token_id, token_uri=None):
+    """Decode the metadata of a token, fetching its tokenURI unless it is passed in."""
+    try:
+        debug = (token_id % 10 == 0 or token_id == 1)
+        if debug:
+            print(f"\n--- Processing token {token_id} ---")
+
+        if token_uri is None:
+            from .client import get_client
+            client = get_client()
+            token_uri = client.contract.functions.tokenURI(token_id).call(block_identifier=client.block_identifier)
+
+        if token_uri.startswith("data:application/json;base64,"):
+            if token_id % 10 == 0 or token_id == 1:
+                print("Detected base64 encoded JSON data")
+            base64_data = token_uri.split("data:application/json;base64,")[1]
+            json_data = base64.b64decode(base64_data).decode('utf-8')
+            metadata = json.loads(json_data)
+
+        elif token_uri.startswith("data:application/json;charset=UTF-8,"):
+            if token_id % 10 == 0 or token_id == 1:
+                print("Detected URL-encoded JSON data")
+            url_encoded_json = token_uri.split("data:application/json;charset=UTF-8,")[1]
+            json_str = urllib.parse.unquote(url_encoded_json)
+            metadata = json.loads(json_str)
+
+        elif "<svg" in token_uri:
+            if token_id % 10 == 0 or token_id == 1:
+                print("Detected SVG data directly in tokenURI")
+            return token_id, {
+                "name": f"Token {token_id} (SVG)",
+                "type": "svg",
+                "data": token_uri[:200] + "..."
+            }
+        else:
+            if token_id % 10 == 0 or token_id == 1:
+                print(f"Unexpected tokenURI format: {token_uri[:100]}...")
+            return token_id, {
+                "error": "Unhandled format",
+                "preview": token_uri[:100] + "..."
+            }
+
+        # Extract relevant information
+        result = {
+            "token_id": token_id,
+            "name": metadata.get("name", f"Token {token_id}"),
+            "description": metadata.get("description", "")[:200] + ("..." if len(metadata.get("description", "")) > 200 else ""),
+            "image": metadata.get("image", "")[:100] + ("..." if len(metadata.get("image", "")) > 100 else ""),
+            "attributes": {}
+        }
+
+        if debug:
+            print(f"Raw metadata keys: {list(metadata.keys())}")
+
+        if "attributes" in metadata:
+            for attr in metadata["attributes"]:
+                trait_type = attr.get("trait_type", "unknown")
+                result["attributes"][trait_type] = attr.get("value")
+
+        return token_id, result
+
+    except Exception as e:
+        print(f"\nError processing token {token_id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return token_id, {"token_id": token_id, "error": str(e)}
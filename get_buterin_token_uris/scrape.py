@@ -0,0 +1,295 @@
+import argparse
+import threading
+
+from tqdm import tqdm
+
+from async_scraper import ConcurrentFetcher, DEFAULT_CONCURRENCY, DEFAULT_RATE, MAX_RATE, MIN_RATE
+from event_logs import changed_token_ids, SYNC_CONFIRMATIONS
+from multicall import fetch_token_uris, is_revert_error, MULTICALL_BATCH_SIZE
+from pipeline import run_pipeline
+from profiler import PROFILER, PROFILE_REPORT
+from provider_pool import PooledHTTPProvider
+from quote_index import build_index_from_store, INDEX_FILE
+from result_store import open_store, RESULTS_DB, QUOTE_MAPPING_JSON
+from stream_decode import decode_token_uri_streaming
+
+from .client import CONTRACT_ADDRESS, get_client, load_abi
+from .decode import get_token_metadata
+
+OUTPUT_FILE = "token_quote_mapping.json"
+BATCH_SIZE = 50  # Process 50 tokens at a time to manage Infura limits
+
+_fetchers = {}  # {(rpc_url, concurrency, rate): ConcurrentFetcher}, shared by every fetch of a run
+_fetchers_lock = threading.Lock()
+
+def concurrent_fetcher(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
+    """Return the run's asyncio engine for these settings, starting it on first use."""
+    client = get_client()
+    key = (client.rpc_urls[0], concurrency, rate)
+    with _fetchers_lock:
+        if key not in _fetchers:
+            _fetchers[key] = ConcurrentFetcher(client.rpc_urls[0], CONTRACT_ADDRESS, load_abi(),
+                                               concurrency=concurrency, rate=rate)
+        return _fetchers[key]
+
+def close_fetchers():
+    """Stop the asyncio engines, adding their traffic to the profile."""
+    with _fetchers_lock:
+        while _fetchers:
+            fetcher = _fetchers.popitem()[1]
+            fetcher.close()
+            # The engine bypasses `w3` and the pool, so its traffic is counted by its own session
+            PROFILER.count_rpc("eth_call", fetcher.totals["requests"], fetcher.totals["request_bytes"],
+                               fetcher.totals["response_bytes"])
+
+def _uses_engine(client, use_multicall):
+    # The asyncio engine has its own single-endpoint provider, so cached and pooled runs go through
+    # Multicall3 on `w3`
+    return not use_multicall and client.cache_mode == "off" and len(client.rpc_urls) <= 1
+
+def _provider_pool(w3):
+    """Return the PooledHTTPProvider under `w3`'s RPC cache, or None (e.g. when replaying the cache)."""
+    pool = w3.provider
+    while not isinstance(pool, PooledHTTPProvider) and getattr(pool, "upstream", None) is not None:
+        pool = pool.upstream
+    return pool if isinstance(pool, PooledHTTPProvider) else None
+
+def fetch_token_batch(token_ids, use_multicall=False, multicall_batch_size=MULTICALL_BATCH_SIZE,
+                      concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
+    """Fetch the raw tokenURIs of `token_ids`, returning (token_uris, errors) dicts keyed by token ID."""
+    if not token_ids:
+        return {}, {}
+    with PROFILER.stage("fetch"):
+        return _fetch_token_batch(token_ids, use_multicall, multicall_batch_size, concurrency, rate)
+
+def _fetch_token_batch(token_ids, use_multicall, multicall_batch_size, concurrency, rate):
+    client = get_client()
+    # Either a few aggregate3 calls or concurrent calls through the rate-limited asyncio engine
+    if not _uses_engine(client, use_multicall):
+        if len(client.rpc_urls) > 1:
+            # Give every endpoint of the pool at least one batch to work on in parallel
+            multicall_batch_size = min(multicall_batch_size, -(-len(token_ids) // len(client.rpc_urls)))
+        return fetch_token_uris(client.w3, client.contract, token_ids, batch_size=multicall_batch_size,
+                                block_identifier=client.block_identifier,
+                                max_workers=min(concurrency, len(client.rpc_urls)))
+    token_uris, errors, _ = concurrent_fetcher(concurrency, rate).fetch(token_ids, client.block_identifier)
+    return token_uris, errors
+
+def fetch_token_batches(token_ids, batch_size=BATCH_SIZE, use_multicall=False, **fetch_options):
+    """Yield (batch, token_uris, errors) for consecutive batches of `token_ids`.
+
+    With the asyncio engine the next batch is already queued on the engine
+    while the caller works through the current one, so fetching never waits
+    for a batch's slowest request and at most two batches are held in memory.
+    """
+    batches = [token_ids[start:start + batch_size] for start in range(0, len(token_ids), batch_size)]
+    client = get_client()
+    if not _uses_engine(client, use_multicall):
+        for batch in batches:
+            yield (batch, *fetch_token_batch(batch, use_multicall=use_multicall, **fetch_options))
+        return
+    fetcher = concurrent_fetcher(fetch_options.get("concurrency", DEFAULT_CONCURRENCY),
+                                 fetch_options.get("rate", DEFAULT_RATE))
+    futures = [fetcher.submit(batch, client.block_identifier) for batch in batches[:2]]
+    for index, batch in enumerate(batches):
+        with PROFILER.stage("fetch"):
+            token_uris, errors, _ = futures[index].result()
+        if index + 2 < len(batches):
+            futures.append(fetcher.submit(batches[index + 2], client.block_identifier))
+        futures[index] = None
+        yield batch, token_uris, errors
+
+def _fetched_tokens(token_ids, **fetch_options):
+    """Yield (token_id, token_uri, error) for `token_ids`, fetched in batches of BATCH_SIZE."""
+    for batch, token_uris, errors in fetch_token_batches(token_ids, **fetch_options):
+        for token_id in batch:
+            yield token_id, token_uris.get(token_id), errors.get(token_id)
+
+def missing_token_ids(start_id, end_id, store, refresh_ids=()):
+    """Token IDs in start_id..end_id without a successful result, plus any the caller knows have changed."""
+    succeeded = store.succeeded_ids()
+    return [token_id for token_id in range(start_id, end_id + 1)
+            if token_id in refresh_ids or token_id not in succeeded]
+
+def keep_previous_results(store, failed):
+    """Return a keep_previous(token_id, error) predicate for refetching tokens already in `store`.
+
+    A token with a successful stored result keeps it when its refetch fails
+    with anything but a revert, i.e. an RPC failure rather than the token no
+    longer existing; its ID is added to `failed` so it can be retried.
+    """
+    succeeded = store.succeeded_ids()
+
+    def keep_previous(token_id, error):
+        if token_id in succeeded and not is_revert_error(error):
+            failed.add(token_id)
+            return True
+        return False
+    return keep_previous
+
+def process_tokens(start_id, end_id, store, refresh_ids=(), stream_decode=False, keep_previous=None,
+                   **fetch_options):
+    """Fetch tokens start_id..end_id missing from `store` (or listed in refresh_ids) and save them to it.
+
+    Tokens whose fetch error `keep_previous(token_id, error)` accepts keep their stored result.
+    """
+    token_ids = missing_token_ids(start_id, end_id, store, refresh_ids)
+
+    decode = decode_token_uri_streaming if stream_decode else get_token_metadata
+    results = {}
+    pending = {}
+    fetched = _fetched_tokens(token_ids, **fetch_options)
+    for token_id, token_uri, fetch_error in tqdm(fetched, total=len(token_ids), desc="Processing tokens"):
+        if fetch_error is not None and keep_previous is not None and keep_previous(token_id, fetch_error):
+            continue
+        try:
+            if fetch_error is not None:
+                result = {"token_id": token_id, "error": fetch_error}
+            else:
+                with PROFILER.stage("decode"):
+                    token_id, result = decode(token_id, token_uri=token_uri)
+
+            if "attributes" in result and isinstance(result["attributes"], dict):
+                if result["attributes"].get("Quote Title") is None and token_id % 10 == 0:
+                    # Log some missing quotes for debugging
+                    print(f"Warning: No quote title found for token {token_id}")
+                    print(f"Available attributes: {list(result['attributes'].keys())}")
+
+        except Exception as e:
+            print(f"\nError processing token {token_id}: {e}")
+            result = {"error": str(e)}
+
+        results[token_id] = pending[token_id] = result
+
+        # Save progress every batch; only the new rows are written
+        if len(pending) >= BATCH_SIZE:
+            with PROFILER.stage("persist"):
+                store.put(pending)
+            pending = {}
+            print(f"\nSaved progress after token {token_id}")
+
+    if pending:
+        with PROFILER.stage("persist"):
+            store.put(pending)
+    print(f"\nProcessing complete! Saved {len(results)} results to {store.path}")
+    return results
+
+def build_quote_mapping_from_results(store):
+    """Export the results and quote-to-token mapping from the result store to the JSON files."""
+    try:
+        store.export_json(OUTPUT_FILE, QUOTE_MAPPING_JSON)
+        quote_mapping = store.quote_mapping()
+
+        print(f"\nBuilt quote mapping with {len(quote_mapping)} unique quotes")
+        print("\nSample of the mapping (first 5 quotes):")
+        for quote, tokens in list(quote_mapping.items())[:5]:
+            print(f"- {quote}: {len(tokens)} tokens")
+
+        return quote_mapping
+
+    except Exception as e:
+        print(f"Error building quote mapping: {e}")
+        return {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m get_buterin_token_uris",
+                                     description="Fetch Buterin Cards metadata and build the quote mapping")
+    parser.add_argument("--multicall", action="store_true",
+                        help="Batch tokenURI calls through Multicall3 aggregate3 instead of one call per token")
+    parser.add_argument("--multicall-batch-size", type=int, default=MULTICALL_BATCH_SIZE,
+                        help=f"tokenURI calls per aggregate3 request (default: {MULTICALL_BATCH_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Concurrent tokenURI requests for the asyncio engine (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Initial requests/sec for the asyncio engine, adapted at runtime between {MIN_RATE} "
+                             f"and {MAX_RATE} (default: {DEFAULT_RATE})")
+    parser.add_argument("--stream-decode", action="store_true",
+                        help="Decode tokenURIs incrementally without materializing the embedded image")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Decode in this many worker processes, pipelined with fetching and writing "
+                             "(default: 0, decode inline)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only refetch tokens with Mined/Transfer events since the last synced block")
+    parser.add_argument("--from-block", type=int,
+                        help="Block to start the incremental sync from, overriding the saved sync state")
+    parser.add_argument("--profile", nargs="?", const=PROFILE_REPORT, metavar="REPORT",
+                        help=f"Record per-stage timings and RPC traffic and write a JSON report "
+                             f"(default: {PROFILE_REPORT})")
+    args = parser.parse_args(argv)
+    if not MIN_RATE <= args.rate <= MAX_RATE:
+        parser.error(f"--rate must be between {MIN_RATE} and {MAX_RATE}")
+    client = get_client()
+    w3, contract = client.w3, client.contract
+    if args.profile:
+        PROFILER.enabled = True
+        pool = _provider_pool(w3)
+        if pool is not None:
+            pool.profiler = PROFILER
+    fetch_options = dict(use_multicall=args.multicall, multicall_batch_size=args.multicall_batch_size,
+                         concurrency=args.concurrency, rate=args.rate)
+
+    MIN_TOKEN_ID = 0
+    MAX_TOKEN_ID = 2014  # 2,015 cards total (0-2014 inclusive)
+
+    # Results are loaded once per run; process_tokens only writes new rows
+    store = open_store(RESULTS_DB, OUTPUT_FILE)
+
+    from_block = None
+    if args.incremental:
+        # Read the head before fetching anything so events mined meanwhile are picked up next run
+        synced_block = w3.eth.block_number - SYNC_CONFIRMATIONS
+        last_block = store.get_meta("last_block")
+        if args.from_block is not None:
+            from_block = args.from_block
+        elif last_block is not None:
+            from_block = last_block + 1
+
+    # Tokens whose refetch failed in an earlier run kept their old result and are retried here
+    failed = set()
+    if from_block is not None:
+        changed = [token_id for token_id in changed_token_ids(w3, contract, from_block, synced_block)
+                   if MIN_TOKEN_ID <= token_id <= MAX_TOKEN_ID]
+        print(f"Found {len(changed)} minted or transferred tokens between blocks {from_block} and {synced_block}")
+        changed = sorted(set(changed).union(store.get_meta("refresh_pending", [])))
+        keep_previous = keep_previous_results(store, failed)
+        if changed and args.workers:
+            run_pipeline(missing_token_ids(changed[0], changed[-1], store, set(changed)),
+                         lambda token_ids: fetch_token_batch(token_ids, **fetch_options), store,
+                         workers=args.workers, keep_previous=keep_previous)
+        elif changed:
+            process_tokens(changed[0], changed[-1], store, refresh_ids=set(changed),
+                           stream_decode=args.stream_decode, keep_previous=keep_previous, **fetch_options)
+    elif args.workers:
+        token_ids = missing_token_ids(MIN_TOKEN_ID, MAX_TOKEN_ID, store)
+        print(f"Processing {len(token_ids)} missing tokens with {args.workers} decode workers")
+        run_pipeline(token_ids, lambda token_ids: fetch_token_batch(token_ids, **fetch_options), store,
+                     workers=args.workers, fetch_batch_size=BATCH_SIZE)
+    else:
+        # No sync state yet: process all tokens to ensure we have the latest data
+        print(f"Processing tokens {MIN_TOKEN_ID} to {MAX_TOKEN_ID} (total: {MAX_TOKEN_ID - MIN_TOKEN_ID + 1} cards)")
+
+        # One pass over the whole range, fetched and saved in batches of BATCH_SIZE
+        process_tokens(MIN_TOKEN_ID, MAX_TOKEN_ID, store, stream_decode=args.stream_decode, **fetch_options)
+    close_fetchers()
+
+    if args.incremental:
+        store.set_meta("refresh_pending", sorted(failed))
+        store.set_meta("last_block", synced_block)
+        print(f"Synced up to block {synced_block}")
+        if failed:
+            print(f"{len(failed)} tokens could not be refetched and kept their previous result; "
+                  f"they are retried on the next run")
+
+    # Now build the quote mapping from the results
+    quote_mapping = build_quote_mapping_from_results(store)
+    build_index_from_store(store, INDEX_FILE)
+    print(f"Trait index written to {INDEX_FILE}")
+    store.close()
+
+    pool = _provider_pool(w3)
+    if pool is not None:
+        pool.print_metrics()
+
+    if args.profile:
+        PROFILER.print_report(PROFILER.write_report(args.profile))
+        print(f"Profile written to {args.profile}")
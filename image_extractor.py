@@ -0,0 +1,259 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from multicall import multicall_function
+from result_store import write_json_atomic
+from stream_decode import BASE64_PREFIX, URL_ENCODED_PREFIX
+
+IMAGES_DIR = "images"
+MANIFEST_FILE = "manifest.json"  # {token_id: sha256 of its JPEG}, inside IMAGES_DIR
+OBJECTS_DIR = "objects"  # content-addressed JPEGs, inside IMAGES_DIR
+PARTS_FILE = "jpeg_parts.json"  # cached shared header and footer, inside IMAGES_DIR
+IMAGE_BATCH_SIZE = 50  # tokens per unit of work: one unpackChunk multicall plus eth_getCode batches
+CODE_BATCH_SIZE = 25  # eth_getCode requests per JSON-RPC batch
+DEFAULT_IMAGE_WORKERS = 4
+JPEG_DATA_PREFIX = "data:image/jpeg;base64,"
+
+
+def _hex_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def sstore2_data(code):
+    """Strip the leading STOP opcode SSTORE2 puts in front of the data it stores as contract code."""
+    code = _hex_bytes(code)
+    return code[1:] if code[:1] == b"\x00" else code
+
+
+def fetch_code(w3, addresses, block_identifier="latest", batch_size=CODE_BATCH_SIZE):
+    """Return {address: bytecode} for many addresses, as JSON-RPC batches when the provider supports them.
+
+    Addresses whose code could not be fetched are left out.
+    """
+    block = hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+    addresses = list(dict.fromkeys(addresses))
+    make_batch_request = getattr(w3.provider, "make_batch_request", None)  # web3 6 providers have none
+    codes = {}
+    for start in range(0, len(addresses), batch_size):
+        batch = addresses[start:start + batch_size]
+        responses = None
+        if make_batch_request is not None:
+            try:
+                responses = make_batch_request([("eth_getCode", [address, block]) for address in batch])
+            except NotImplementedError:
+                pass
+        # A short or padded batch can't be matched to the addresses, so it counts as rejected
+        if isinstance(responses, list) and len(responses) == len(batch):
+            for address, response in zip(batch, responses):
+                if response.get("error") is None and response.get("result") is not None:
+                    codes[address] = _hex_bytes(response["result"])
+            continue
+        # No batch support, or the whole batch was rejected: one request per address
+        for address in batch:
+            try:
+                codes[address] = bytes(w3.eth.get_code(address, block_identifier=block_identifier))
+            except Exception as e:
+                print(f"eth_getCode({address}) failed: {e}")
+    return codes
+
+
+def assemble_jpeg(header, chunk, footer):
+    """Concatenate the shared header, a token's chunk and the footer into JPEG bytes.
+
+    The parts are either raw JPEG bytes or base64 text meant to be
+    concatenated before decoding; both layouts are accepted. Base64 is
+    decoded strictly, so parts that don't line up raise instead of
+    silently producing a truncated image.
+    """
+    data = header + chunk + footer
+    if data[:2] == b"\xff\xd8":
+        return data
+    return base64.b64decode(data, validate=True)
+
+
+class ImageExtractor:
+    """Rebuilds the card JPEGs from the contract's SSTORE2 chunk storage into a content-addressed directory.
+
+    Files are stored once per distinct JPEG under objects/<sha256>.jpg and
+    hard-linked as <token_id>.jpg. The manifest of finished tokens is saved
+    after every batch, so an interrupted export resumes where it stopped.
+    """
+
+    def __init__(self, w3, contract, output_dir=IMAGES_DIR, block_identifier="latest"):
+        self.w3 = w3
+        self.contract = contract
+        self.output_dir = output_dir
+        self.block_identifier = block_identifier
+        self.manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        os.makedirs(os.path.join(output_dir, OBJECTS_DIR), exist_ok=True)
+        try:
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = {int(token_id): digest for token_id, digest in json.load(f).items()}
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+        self.header, self.footer = self._jpeg_parts()
+
+    def _jpeg_parts(self):
+        """Return (header, footer), fetched from the contract once and cached next to the images."""
+        parts_path = os.path.join(self.output_dir, PARTS_FILE)
+        try:
+            with open(parts_path, 'r') as f:
+                parts = json.load(f)
+            if parts["contract"] == self.contract.address:
+                return bytes.fromhex(parts["header"]), bytes.fromhex(parts["footer"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+        pointer = self.contract.functions.JPEG_HEADER_POINTER().call(block_identifier=self.block_identifier)
+        header = sstore2_data(self.w3.eth.get_code(pointer, block_identifier=self.block_identifier))
+        footer = bytes(self.contract.functions.jpegFooter().call(block_identifier=self.block_identifier))
+        write_json_atomic(parts_path, {"contract": self.contract.address, "header": header.hex(),
+                                       "footer": footer.hex()})
+        return header, footer
+
+    def object_path(self, digest):
+        return os.path.join(self.output_dir, OBJECTS_DIR, f"{digest}.jpg")
+
+    def token_path(self, token_id):
+        return os.path.join(self.output_dir, f"{token_id}.jpg")
+
+    def pending(self, token_ids):
+        """Token IDs without an extracted image on disk."""
+        return [token_id for token_id in token_ids
+                if token_id not in self.manifest or not os.path.exists(self.token_path(token_id))]
+
+    def _store(self, token_id, jpeg):
+        digest = hashlib.sha256(jpeg).hexdigest()
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            tmp_path = f"{object_path}.{token_id}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(jpeg)
+            os.replace(tmp_path, object_path)
+        token_path = self.token_path(token_id)
+        if os.path.exists(token_path):
+            os.remove(token_path)
+        try:
+            os.link(object_path, token_path)
+        except OSError:
+            with open(token_path, 'wb') as f:
+                f.write(jpeg)
+        return digest
+
+    def extract_batch(self, token_ids):
+        """Extract the images of some tokens. Returns ({token_id: sha256}, {token_id: error})."""
+        digests, errors = {}, {}
+        chunks = multicall_function(self.w3, self.contract, "unpackChunk", [(token_id,) for token_id in token_ids],
+                                    block_identifier=self.block_identifier)
+        pointers = {}
+        for token_id, (success, value) in zip(token_ids, chunks):
+            if not success:
+                errors[token_id] = f"unpackChunk failed: {value}"
+            elif int(value[0], 16) == 0:
+                errors[token_id] = "not mined"
+            else:
+                pointers[token_id] = (value[0], value[8])  # dataPointer, Nbytes
+
+        codes = fetch_code(self.w3, [pointer for pointer, _ in pointers.values()], self.block_identifier)
+        for token_id, (pointer, nbytes) in pointers.items():
+            if pointer not in codes:
+                errors[token_id] = f"eth_getCode({pointer}) failed"
+                continue
+            chunk = sstore2_data(codes[pointer])
+            if nbytes and len(chunk) > nbytes:
+                chunk = chunk[:nbytes]
+            try:
+                digests[token_id] = self._store(token_id, assemble_jpeg(self.header, chunk, self.footer))
+            except (ValueError, OSError) as e:
+                errors[token_id] = str(e)
+        return digests, errors
+
+    def extract(self, token_ids, workers=DEFAULT_IMAGE_WORKERS, batch_size=IMAGE_BATCH_SIZE):
+        """Extract every pending token in parallel batches. Returns {token_id: error} for tokens that failed."""
+        token_ids = self.pending(token_ids)
+        batches = [token_ids[start:start + batch_size] for start in range(0, len(token_ids), batch_size)]
+        errors = {}
+        started = time.perf_counter()
+        done = 0
+        with ThreadPoolExecutor(workers) as executor:
+            futures = {executor.submit(self.extract_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    digests, batch_errors = future.result()
+                except Exception as e:
+                    digests, batch_errors = {}, {token_id: str(e) for token_id in futures[future]}
+                self.manifest.update(digests)
+                errors.update(batch_errors)
+                write_json_atomic(self.manifest_path, {str(token_id): digest
+                                                       for token_id, digest in sorted(self.manifest.items())})
+                done += len(futures[future])
+                print(f"{done}/{len(token_ids)} tokens, {len(self.manifest)} images, "
+                      f"{len(set(self.manifest.values()))} distinct ({time.perf_counter() - started:.1f}s)")
+        return errors
+
+
+def token_uri_jpeg(token_uri):
+    """Return the JPEG embedded in a tokenURI's image field, or None if the image is not an inline JPEG."""
+    if token_uri.startswith(BASE64_PREFIX):
+        metadata = json.loads(base64.b64decode(token_uri[len(BASE64_PREFIX):]))
+    elif token_uri.startswith(URL_ENCODED_PREFIX):
+        metadata = json.loads(urllib.parse.unquote(token_uri[len(URL_ENCODED_PREFIX):]))
+    else:
+        return None
+    image = metadata.get("image", "")
+    return base64.b64decode(image[len(JPEG_DATA_PREFIX):]) if image.startswith(JPEG_DATA_PREFIX) else None
+
+
+def verify(extractor, token_ids, sample_size=10, seed=None):
+    """Compare extracted images of a sample of tokens with the JPEG embedded in their tokenURI."""
+    from multicall import fetch_token_uris
+
+    candidates = [token_id for token_id in token_ids if token_id in extractor.manifest]
+    sample = random.Random(seed).sample(candidates, min(sample_size, len(candidates)))
+    token_uris, _ = fetch_token_uris(extractor.w3, extractor.contract, sample,
+                                     block_identifier=extractor.block_identifier)
+    mismatches = []
+    for token_id in sample:
+        expected = token_uri_jpeg(token_uris.get(token_id, ""))
+        if expected is None:
+            print(f"Token {token_id}: tokenURI has no inline JPEG to compare against")
+        elif hashlib.sha256(expected).hexdigest() != extractor.manifest[token_id]:
+            mismatches.append(token_id)
+    print(f"Verified {len(sample)} tokens against their tokenURI: {len(mismatches)} mismatches {mismatches or ''}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    from get_buterin_token_uris import w3, contract, BLOCK_IDENTIFIER
+
+    parser = argparse.ArgumentParser(description="Rebuild the card JPEGs from on-chain chunk storage")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=2014)
+    parser.add_argument("--output-dir", default=IMAGES_DIR, help=f"Output directory (default: {IMAGES_DIR})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_IMAGE_WORKERS,
+                        help=f"Batches extracted in parallel (default: {DEFAULT_IMAGE_WORKERS})")
+    parser.add_argument("--batch-size", type=int, default=IMAGE_BATCH_SIZE)
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="Afterwards, compare N random images with the JPEG in their tokenURI")
+    args = parser.parse_args()
+
+    extractor = ImageExtractor(w3, contract, args.output_dir, BLOCK_IDENTIFIER)
+    token_ids = list(range(args.start, args.end + 1))
+    print(f"{len(token_ids) - len(extractor.pending(token_ids))} of {len(token_ids)} images already extracted")
+    errors = extractor.extract(token_ids, workers=args.workers, batch_size=args.batch_size)
+    if errors:
+        not_mined = sum(1 for error in errors.values() if error == "not mined")
+        print(f"{len(errors)} tokens without an image ({not_mined} not mined); first errors:")
+        for token_id, error in sorted(errors.items())[:10]:
+            if error != "not mined":
+                print(f"  {token_id}: {error}")
+    if args.verify:
+        verify(extractor, token_ids, args.verify)
@@ -0,0 +1,149 @@
+import json
+import random
+import argparse
+
+from event_logs import event_topic, get_logs_chunked
+from multicall import fetch_token_uris
+from result_store import write_json_atomic
+
+MINED_LOG_CHUNK_SIZE = 5_000_000  # start with huge ranges, get_logs_range splits them when needed
+MINED_EVENTS_FILE = "mined_events.json"
+QUOTE_TITLES_FILE = "quote_titles.json"
+QUOTE_MAPPING_FILE = "quote_token_mapping.json"
+MINED_FIELDS = ("phaseId", "tokenIdWithinPhase", "quoteId", "bgDirectionId", "bgPaletteId",
+                "lastTokenIdInScan", "Nbytes", "Nicons", "seed")
+
+
+def fetch_mined_events(w3, contract, from_block, to_block, chunk_size=MINED_LOG_CHUNK_SIZE):
+    """Return {token_id: traits} decoded from the contract's Mined logs between two blocks."""
+    mined_event = contract.events.Mined()
+    events = {}
+    logs = get_logs_chunked(w3, contract.address, [event_topic(contract.abi, "Mined")],
+                            from_block, to_block, chunk_size)
+    for log in logs:
+        event = mined_event.process_log(log)
+        args = event["args"]
+        events[args["tokenId"]] = {
+            "token_id": args["tokenId"],
+            "miner": args["minerAddress"],
+            "uploaded_kb": args["uploadedKB"],
+            "block_number": event["blockNumber"],
+            **{field: args[field] for field in MINED_FIELDS},
+        }
+    return events
+
+
+def fetch_token_titles(w3, contract, token_ids, decode):
+    """Fetch the "Quote Title" of a few tokens through their tokenURI.
+
+    `decode` is called as decode(token_id, token_uri=...) and must return
+    (token_id, result) like get_token_metadata.
+    """
+    token_uris, errors = fetch_token_uris(w3, contract, token_ids)
+    for token_id, error in errors.items():
+        print(f"Could not fetch tokenURI of token {token_id}: {error}")
+    titles = {}
+    for token_id, token_uri in token_uris.items():
+        _, result = decode(token_id, token_uri=token_uri)
+        titles[token_id] = result.get("attributes", {}).get("Quote Title")
+    return titles
+
+
+def build_quote_titles(events, known_titles=None, fetch_titles=None):
+    """Build the quoteId -> title table.
+
+    Titles are taken from `known_titles` ({token_id: title}, e.g. earlier
+    tokenURI results) where possible. For quoteIds that are still unknown,
+    `fetch_titles` is called once with one representative token per quoteId.
+    """
+    known_titles = known_titles or {}
+    quote_titles = {}
+    representatives = {}
+    for token_id, traits in sorted(events.items()):
+        quote_id = traits["quoteId"]
+        if quote_id in quote_titles:
+            continue
+        if known_titles.get(token_id):
+            quote_titles[quote_id] = known_titles[token_id]
+            representatives.pop(quote_id, None)
+        else:
+            representatives.setdefault(quote_id, token_id)
+
+    if representatives and fetch_titles is not None:
+        print(f"Fetching titles of {len(representatives)} quotes through tokenURI")
+        fetched = fetch_titles(list(representatives.values()))
+        for quote_id, token_id in representatives.items():
+            if fetched.get(token_id):
+                quote_titles[quote_id] = fetched[token_id]
+    return quote_titles
+
+
+def quote_mapping_from_events(events, quote_titles):
+    """Build the quote title -> token IDs mapping written to quote_token_mapping.json."""
+    quote_mapping = {}
+    for token_id, traits in sorted(events.items()):
+        title = quote_titles.get(traits["quoteId"])
+        if title is None:
+            continue
+        quote_mapping.setdefault(title, []).append(token_id)
+    return quote_mapping
+
+
+def cross_check(events, quote_titles, fetch_titles, sample_size=20, seed=None):
+    """Compare log-derived titles with tokenURI-derived titles for a random sample of tokens.
+
+    Returns a list of (token_id, log_title, token_uri_title) mismatches.
+    """
+    token_ids = sorted(events)
+    sample = random.Random(seed).sample(token_ids, min(sample_size, len(token_ids)))
+    fetched = fetch_titles(sample)
+    mismatches = []
+    for token_id in sorted(sample):
+        log_title = quote_titles.get(events[token_id]["quoteId"])
+        if token_id in fetched and fetched[token_id] != log_title:
+            mismatches.append((token_id, log_title, fetched[token_id]))
+    print(f"Cross-checked {len(fetched)} tokens against tokenURI: {len(mismatches)} mismatches")
+    for token_id, log_title, uri_title in mismatches:
+        print(f"- token {token_id}: logs say '{log_title}', tokenURI says '{uri_title}'")
+    return mismatches
+
+
+if __name__ == "__main__":
+    from get_buterin_token_uris import w3, contract, get_token_metadata, OUTPUT_FILE
+    from result_store import open_store, RESULTS_DB
+
+    parser = argparse.ArgumentParser(description="Build the quote mapping from Mined event logs")
+    parser.add_argument("--from-block", type=int, default=0, help="First block to scan (default: 0)")
+    parser.add_argument("--to-block", type=int, help="Last block to scan (default: latest)")
+    parser.add_argument("--chunk-size", type=int, default=MINED_LOG_CHUNK_SIZE,
+                        help=f"Blocks per eth_getLogs request before automatic splitting (default: {MINED_LOG_CHUNK_SIZE})")
+    parser.add_argument("--cross-check", type=int, default=20, metavar="N",
+                        help="Compare N random tokens against their tokenURI (0 to skip, default: 20)")
+    args = parser.parse_args()
+
+    to_block = args.to_block if args.to_block is not None else w3.eth.block_number
+    events = fetch_mined_events(w3, contract, args.from_block, to_block, args.chunk_size)
+    print(f"Decoded {len(events)} Mined events between blocks {args.from_block} and {to_block}")
+    write_json_atomic(MINED_EVENTS_FILE, {str(token_id): traits for token_id, traits in sorted(events.items())})
+
+    def fetch_titles(token_ids):
+        return fetch_token_titles(w3, contract, token_ids, get_token_metadata)
+
+    # Reuse a previous title table, then fill the gaps from earlier results or tokenURI
+    try:
+        with open(QUOTE_TITLES_FILE, 'r') as f:
+            quote_titles = {int(quote_id): title for quote_id, title in json.load(f).items()}
+    except (FileNotFoundError, json.JSONDecodeError):
+        quote_titles = {}
+    missing = {token_id: traits for token_id, traits in events.items() if traits["quoteId"] not in quote_titles}
+    with open_store(RESULTS_DB, OUTPUT_FILE) as store:
+        known_titles = store.token_quotes()
+    quote_titles.update(build_quote_titles(missing, known_titles, fetch_titles))
+    write_json_atomic(QUOTE_TITLES_FILE, {str(quote_id): title for quote_id, title in sorted(quote_titles.items())})
+
+    quote_mapping = quote_mapping_from_events(events, quote_titles)
+    write_json_atomic(QUOTE_MAPPING_FILE, quote_mapping)
+    print(f"Built quote mapping with {len(quote_mapping)} unique quotes from logs")
+
+    if args.cross_check:
+        cross_check(events, quote_titles, fetch_titles, sample_size=args.cross_check)
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import eth_abi
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
+
+# Multicall3 is deployed at the same address on mainnet and most other chains
+MULTICALL3_ADDRESS = Web3.to_checksum_address("0xcA11bde05977b3631167028862bE2a173976CA11")
+MULTICALL_BATCH_SIZE = 50  # tokenURI responses embed the card image, so keep batches modest
+
+# Provider errors that mean an aggregate3 batch was too big to execute or return and should be split
+BATCH_TOO_LARGE_MARKERS = ("out of gas", "gas required exceeds", "exceeds block gas limit", "gas limit reached",
+                           "response size exceeded", "response is too big", "too large", "size limit")
+
+MULTICALL3_ABI = [
+    {"inputs":[{"components":[{"internalType":"address","name":"target","type":"address"},{"internalType":"bool","name":"allowFailure","type":"bool"},{"internalType":"bytes","name":"callData","type":"bytes"}],"internalType":"struct Multicall3.Call3[]","name":"calls","type":"tuple[]"}],"name":"aggregate3","outputs":[{"components":[{"internalType":"bool","name":"success","type":"bool"},{"internalType":"bytes","name":"returnData","type":"bytes"}],"internalType":"struct Multicall3.Result[]","name":"returnData","type":"tuple[]"}],"stateMutability":"payable","type":"function"}
+]
+
+
+# tokenURI errors meaning the token does not exist at the block (e.g. its mint was reorged out), as
+# opposed to RPC failures worth retrying
+REVERT_MARKERS = ("revert", "nonexistent token", "invalid token")
+
+
+def is_revert_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in REVERT_MARKERS)
+
+
+def is_batch_too_large_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in BATCH_TOO_LARGE_MARKERS)
+
+
+def _abi_type(param):
+    """Return the canonical ABI type string for an ABI input/output entry."""
+    abi_type = param["type"]
+    if abi_type.startswith("tuple"):
+        inner = ",".join(_abi_type(c) for c in param["components"])
+        return f"({inner}){abi_type[len('tuple'):]}"
+    return abi_type
+
+
+def _function_abi(contract, fn_name):
+    for entry in contract.abi:
+        if entry.get("type") == "function" and entry.get("name") == fn_name:
+            return entry
+    raise ValueError(f"Function {fn_name} not found in contract ABI")
+
+
+def aggregate3(w3, calls, block_identifier="latest"):
+    """Run (target, callData) pairs through Multicall3.aggregate3.
+
+    Every sub-call is sent with allowFailure=True, so a reverting call shows up
+    as success=False in the returned list of (success, returnData) tuples
+    instead of failing the whole batch.
+    """
+    multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+    return multicall.functions.aggregate3(
+        [(target, True, call_data) for target, call_data in calls]
+    ).call(block_identifier=block_identifier)
+
+
+def multicall_function(w3, contract, fn_name, args_list, batch_size=MULTICALL_BATCH_SIZE,
+                       block_identifier="latest", max_workers=1):
+    """Call a view function of `contract` once per entry in `args_list` using Multicall3.
+
+    Returns a list of (success, value) tuples in the same order as `args_list`.
+    A sub-call that reverts is retried on its own with a plain eth_call; if that
+    fails too, value holds the error message. If a whole batch is rejected
+    for its size (response too large or out of gas) it is split in half and
+    retried; any other error, such as a transport failure, is raised.
+    With max_workers > 1 batches are sent from that many threads, which only
+    pays off when the provider spreads them over several endpoints.
+    """
+    fn_abi = _function_abi(contract, fn_name)
+    input_types = [_abi_type(i) for i in fn_abi["inputs"]]
+    output_types = [_abi_type(o) for o in fn_abi["outputs"]]
+    selector = function_signature_to_4byte_selector(f"{fn_name}({','.join(input_types)})")
+
+    def single_call(args):
+        try:
+            return True, getattr(contract.functions, fn_name)(*args).call(block_identifier=block_identifier)
+        except Exception as e:
+            return False, str(e)
+
+    def run_batch(batch):
+        if len(batch) == 1:
+            return [single_call(batch[0])]
+        calls = [(contract.address, selector + eth_abi.encode(input_types, list(args))) for args in batch]
+        try:
+            responses = aggregate3(w3, calls, block_identifier=block_identifier)
+        except Exception as e:
+            if not is_batch_too_large_error(e):
+                raise
+            print(f"\nMulticall batch of {len(batch)} failed ({e}), splitting")
+            middle = len(batch) // 2
+            return run_batch(batch[:middle]) + run_batch(batch[middle:])
+
+        results = []
+        for args, (success, return_data) in zip(batch, responses):
+            if not success:
+                results.append(single_call(args))
+                continue
+            values = eth_abi.decode(output_types, return_data)
+            results.append((True, values[0] if len(values) == 1 else values))
+        return results
+
+    args_list = [tuple(args) for args in args_list]
+    batches = [args_list[start:start + batch_size] for start in range(0, len(args_list), batch_size)]
+    results = []
+    if max_workers > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(min(max_workers, len(batches))) as executor:
+            for batch_results in executor.map(run_batch, batches):
+                results.extend(batch_results)
+    else:
+        for batch in batches:
+            results.extend(run_batch(batch))
+    return results
+
+
+def fetch_token_uris(w3, contract, token_ids, batch_size=MULTICALL_BATCH_SIZE, block_identifier="latest",
+                     max_workers=1):
+    """Fetch tokenURI for many tokens via Multicall3.
+
+    Returns (token_uris, errors): dicts keyed by token ID holding the raw
+    tokenURI string or the error message for tokens that could not be fetched.
+    """
+    token_ids = list(token_ids)
+    token_uris, errors = {}, {}
+    responses = multicall_function(w3, contract, "tokenURI", [(token_id,) for token_id in token_ids],
+                                   batch_size=batch_size, block_identifier=block_identifier,
+                                   max_workers=max_workers)
+    for token_id, (success, value) in zip(token_ids, responses):
+        if success:
+            token_uris[token_id] = value
+        else:
+            errors[token_id] = value
+    return token_uris, errors
@@ -0,0 +1,171 @@
+import argparse
+import csv
+import os
+import re
+import time
+
+from web3 import Web3
+
+from event_logs import event_topic, get_logs_chunked, log_address_topic, log_token_id
+from multicall import multicall_function
+
+SNAPSHOT_DIR = "snapshots"
+OWNER_BATCH_SIZE = 500  # ownerOf/tokenByIndex responses are tiny, so batches can be large
+TRANSFER_LOG_CHUNK_SIZE = 5_000_000  # get_logs_range splits ranges the provider rejects
+ZERO_ADDRESS = "0x" + "00" * 20
+
+_SNAPSHOT_NAME = re.compile(r"owners_(\d+)\.csv$")
+
+
+def snapshot_by_calls(w3, contract, block, batch_size=OWNER_BATCH_SIZE):
+    """Return {token_id: owner} at `block` from totalSupply, tokenByIndex and ownerOf, batched via Multicall3."""
+    total_supply = contract.functions.totalSupply().call(block_identifier=block)
+    indexes = multicall_function(w3, contract, "tokenByIndex", [(index,) for index in range(total_supply)],
+                                 batch_size=batch_size, block_identifier=block)
+    token_ids = []
+    for index, (success, value) in enumerate(indexes):
+        if success:
+            token_ids.append(value)
+        else:
+            print(f"tokenByIndex({index}) failed: {value}")
+
+    owners = {}
+    responses = multicall_function(w3, contract, "ownerOf", [(token_id,) for token_id in token_ids],
+                                   batch_size=batch_size, block_identifier=block)
+    for token_id, (success, value) in zip(token_ids, responses):
+        if success:
+            owners[token_id] = value
+        else:
+            print(f"ownerOf({token_id}) failed: {value}")
+    return owners
+
+
+def apply_transfer_logs(owners, w3, contract, from_block, to_block, chunk_size=TRANSFER_LOG_CHUNK_SIZE):
+    """Apply the contract's Transfer logs between two blocks (inclusive) to {token_id: owner} in place.
+
+    Returns the number of Transfer logs applied.
+    """
+    logs = list(get_logs_chunked(w3, contract.address, [event_topic(contract.abi, "Transfer")],
+                                 from_block, to_block, chunk_size))
+    logs.sort(key=lambda log: (log["blockNumber"], log["logIndex"]))
+    for log in logs:
+        token_id = log_token_id(log)
+        new_owner = log_address_topic(log, 2)
+        if new_owner == ZERO_ADDRESS:
+            owners.pop(token_id, None)
+        else:
+            owners[token_id] = Web3.to_checksum_address(new_owner)
+    return len(logs)
+
+
+def holders(owners):
+    """Invert {token_id: owner} into {owner: sorted token IDs}."""
+    by_owner = {}
+    for token_id, owner in sorted(owners.items()):
+        by_owner.setdefault(owner, []).append(token_id)
+    return by_owner
+
+
+def write_snapshot(owners, block, snapshot_dir=SNAPSHOT_DIR):
+    """Write owners_<block>.csv (block, token_id, owner) and holders_<block>.csv (block, owner, count, token_ids).
+
+    One row per token/holder with the block repeated on every row, so
+    snapshots can be concatenated and loaded straight into a columnar tool.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    owners_path = os.path.join(snapshot_dir, f"owners_{block}.csv")
+    holders_path = os.path.join(snapshot_dir, f"holders_{block}.csv")
+    by_owner = holders(owners)
+    # Written to .tmp files and renamed, owners last, so latest_snapshot() never picks up a partial snapshot
+    with open(f"{holders_path}.tmp", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["block", "owner", "token_count", "token_ids"])
+        for owner, token_ids in sorted(by_owner.items(), key=lambda item: (-len(item[1]), item[0])):
+            writer.writerow([block, owner, len(token_ids), " ".join(str(token_id) for token_id in token_ids)])
+    with open(f"{owners_path}.tmp", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["block", "token_id", "owner"])
+        writer.writerows((block, token_id, owner) for token_id, owner in sorted(owners.items()))
+    os.replace(f"{holders_path}.tmp", holders_path)
+    os.replace(f"{owners_path}.tmp", owners_path)
+    return owners_path, holders_path
+
+
+def load_snapshot(path):
+    """Return (block, {token_id: owner}) from an owners_<block>.csv file."""
+    owners = {}
+    block = None
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            block = int(row["block"])
+            owners[int(row["token_id"])] = row["owner"]
+    if block is None:
+        block = int(_SNAPSHOT_NAME.search(path).group(1))
+    return block, owners
+
+
+def latest_snapshot(snapshot_dir=SNAPSHOT_DIR, before_block=None):
+    """Return the path of the newest owners snapshot at or before `before_block`, or None."""
+    if not os.path.isdir(snapshot_dir):
+        return None
+    candidates = []
+    for filename in os.listdir(snapshot_dir):
+        match = _SNAPSHOT_NAME.match(filename)
+        if match and (before_block is None or int(match.group(1)) <= before_block):
+            candidates.append((int(match.group(1)), os.path.join(snapshot_dir, filename)))
+    return max(candidates)[1] if candidates else None
+
+
+def timed(label, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label}: {time.perf_counter() - started:.2f}s")
+    return result
+
+
+if __name__ == "__main__":
+    from get_buterin_token_uris import w3, contract
+
+    parser = argparse.ArgumentParser(description="Snapshot the owners of all Buterin Cards at a block")
+    parser.add_argument("--block", type=int, help="Block to snapshot (default: latest)")
+    parser.add_argument("--strategy", choices=("auto", "calls", "logs", "incremental", "compare"), default="auto",
+                        help="calls: batched ownerOf; logs: replay all Transfer logs; incremental: apply new "
+                             "Transfer logs to the previous snapshot; compare: time calls and logs; "
+                             "auto: incremental if a previous snapshot exists, else calls")
+    parser.add_argument("--from-block", type=int, default=0,
+                        help="First block to replay Transfer logs from with --strategy logs (default: 0)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help=f"Output directory (default: {SNAPSHOT_DIR})")
+    args = parser.parse_args()
+
+    block = args.block if args.block is not None else w3.eth.block_number
+    previous = latest_snapshot(args.snapshot_dir, block)
+    strategy = args.strategy
+    if strategy == "auto":
+        strategy = "incremental" if previous else "calls"
+    if strategy == "incremental" and not previous:
+        raise SystemExit(f"No previous snapshot in {args.snapshot_dir}; run with --strategy calls first")
+
+    if strategy == "calls":
+        owners = timed("ownerOf via Multicall3", snapshot_by_calls, w3, contract, block)
+    elif strategy == "logs":
+        owners = {}
+        count = timed("Transfer log replay", apply_transfer_logs, owners, w3, contract, args.from_block, block)
+        print(f"Replayed {count} Transfer logs")
+    elif strategy == "incremental":
+        previous_block, owners = load_snapshot(previous)
+        count = timed(f"Transfer logs since block {previous_block}", apply_transfer_logs,
+                      owners, w3, contract, previous_block + 1, block)
+        print(f"Applied {count} Transfer logs to the snapshot at block {previous_block}")
+    else:
+        owners = timed("ownerOf via Multicall3", snapshot_by_calls, w3, contract, block)
+        replayed = {}
+        count = timed("Transfer log replay", apply_transfer_logs, replayed, w3, contract, args.from_block, block)
+        differing = sorted(token_id for token_id in set(owners) | set(replayed)
+                           if owners.get(token_id) != replayed.get(token_id))
+        print(f"Replayed {count} Transfer logs; {len(differing)} tokens differ between strategies")
+        if differing:
+            print(f"First differing tokens: {differing[:20]}")
+
+    owners_path, holders_path = write_snapshot(owners, block, args.snapshot_dir)
+    print(f"Snapshot at block {block}: {len(owners)} tokens held by {len(holders(owners))} owners")
+    print(f"Wrote {owners_path} and {holders_path}")
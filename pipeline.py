@@ -0,0 +1,159 @@
+import collections
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from tqdm import tqdm
+
+from profiler import PROFILER
+from stream_decode import decode_token_uri_streaming
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+FETCH_BATCH_SIZE = 50  # tokens per fetch call (one aggregate3 request with --multicall)
+DECODE_BATCH_SIZE = 10  # tokenURIs per task sent to a decode worker
+QUEUE_SIZE = 8  # batches buffered between stages before the producer blocks
+WRITE_BATCH_SIZE = 50  # results per store transaction
+
+_DONE = object()
+
+
+def _decode_batch(items):
+    """Decode (token_id, token_uri, error) items in a worker process; also returns the seconds spent."""
+    started = time.perf_counter()
+    results = []
+    for token_id, token_uri, error in items:
+        if error is not None:
+            results.append((token_id, {"token_id": token_id, "error": error}))
+        else:
+            results.append(decode_token_uri_streaming(token_id, token_uri))
+    return results, time.perf_counter() - started
+
+
+class StageStats:
+    """Items handled and time spent busy in one pipeline stage.
+
+    For the decode stage `busy` is summed over all workers, and the reported
+    rate is what the stage sustains with `parallelism` workers busy.
+    """
+
+    def __init__(self, name, parallelism=1):
+        self.name = name
+        self.parallelism = parallelism
+        self.items = 0
+        self.busy = 0.0
+
+    def report(self):
+        rate = self.items * self.parallelism / self.busy if self.busy > 0 else 0.0
+        return f"{self.name:>7}: {self.items} tokens, {self.busy:.1f}s busy, {rate:.1f} tokens/s"
+
+
+def run_pipeline(token_ids, fetch_batch, store, workers=DEFAULT_WORKERS, fetch_batch_size=FETCH_BATCH_SIZE,
+                 decode_batch_size=DECODE_BATCH_SIZE, queue_size=QUEUE_SIZE, keep_previous=None):
+    """Fetch, decode and store tokens as a three-stage producer/consumer pipeline.
+
+    `fetch_batch(token_ids)` must return (token_uris, errors) dicts keyed by
+    token ID. A fetch thread feeds raw tokenURIs into a bounded queue, a
+    dispatcher hands them to a ProcessPoolExecutor for decoding with a
+    bounded number of tasks in flight, and this thread writes the decoded
+    results to `store`. A slow stage therefore blocks the one before it
+    instead of buffering the whole collection in memory. Tokens whose fetch
+    error `keep_previous(token_id, error)` accepts are left as they are in
+    the store.
+
+    Returns {stage name: StageStats}.
+    """
+    token_ids = list(token_ids)
+    fetched = queue.Queue(maxsize=queue_size)
+    decoded = queue.Queue(maxsize=queue_size)
+    stats = {"fetch": StageStats("fetch"), "decode": StageStats("decode", workers), "write": StageStats("write")}
+    failures = []
+
+    def fetch_stage():
+        try:
+            for start in range(0, len(token_ids), fetch_batch_size):
+                batch = token_ids[start:start + fetch_batch_size]
+                started = time.perf_counter()
+                token_uris, errors = fetch_batch(batch)
+                stats["fetch"].busy += time.perf_counter() - started
+                stats["fetch"].items += len(batch)
+                items = [(token_id, token_uris.get(token_id),
+                          errors.get(token_id, None if token_id in token_uris else "tokenURI not fetched"))
+                         for token_id in batch]
+                if keep_previous is not None:
+                    items = [item for item in items if item[2] is None or not keep_previous(item[0], item[2])]
+                for offset in range(0, len(items), decode_batch_size):
+                    fetched.put(items[offset:offset + decode_batch_size])
+        except Exception as e:
+            failures.append(e)
+        finally:
+            fetched.put(_DONE)
+
+    def decode_stage(executor):
+        # Futures are collected in submission order, so at most `workers * 2` tasks are in flight
+        in_flight = collections.deque()
+        fetch_done = False
+
+        def collect():
+            results, seconds = in_flight.popleft().result()
+            PROFILER.record("decode", seconds / max(1, len(results)), count=len(results))
+            stats["decode"].busy += seconds
+            stats["decode"].items += len(results)
+            decoded.put(results)
+
+        try:
+            while True:
+                items = fetched.get()
+                if items is _DONE:
+                    fetch_done = True
+                    break
+                in_flight.append(executor.submit(_decode_batch, items))
+                while len(in_flight) >= workers * 2:
+                    collect()
+            while in_flight:
+                collect()
+        except Exception as e:
+            failures.append(e)
+            # Keep draining so the fetch thread is never left blocked on a full queue
+            while not fetch_done:
+                fetch_done = fetched.get() is _DONE
+        finally:
+            decoded.put(_DONE)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        fetcher = threading.Thread(target=fetch_stage, name="fetch", daemon=True)
+        dispatcher = threading.Thread(target=decode_stage, args=(executor,), name="decode", daemon=True)
+        fetcher.start()
+        dispatcher.start()
+
+        pending = {}
+        with tqdm(total=len(token_ids), desc="Processing tokens") as progress:
+            while True:
+                results = decoded.get()
+                if results is _DONE:
+                    break
+                started = time.perf_counter()
+                pending.update(results)
+                if len(pending) >= WRITE_BATCH_SIZE:
+                    with PROFILER.stage("persist"):
+                        store.put(pending)
+                    pending = {}
+                stats["write"].busy += time.perf_counter() - started
+                stats["write"].items += len(results)
+                progress.update(len(results))
+            if pending:
+                started = time.perf_counter()
+                with PROFILER.stage("persist"):
+                    store.put(pending)
+                stats["write"].busy += time.perf_counter() - started
+
+        fetcher.join()
+        dispatcher.join()
+
+    if failures:
+        raise failures[0]
+    print("\nPipeline throughput:")
+    for stage in stats.values():
+        print(f"  {stage.report()}")
+    return stats
@@ -0,0 +1,121 @@
+import contextlib
+import json
+import math
+import threading
+import time
+from array import array
+
+PROFILE_REPORT = "profile_report.json"
+
+
+class Histogram:
+    """Durations of one stage: exact percentiles from the raw samples plus power-of-two millisecond buckets."""
+
+    def __init__(self):
+        self.samples = array("d")
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    def buckets(self):
+        """Return {"<=N ms": count} with N doubling from 1 ms."""
+        counts = {}
+        for seconds in self.samples:
+            bound = 2 ** max(0, math.ceil(math.log2(max(seconds * 1000, 1e-9))))
+            counts[bound] = counts.get(bound, 0) + 1
+        return {f"<={bound}ms": counts[bound] for bound in sorted(counts)}
+
+    def summary(self):
+        count = len(self.samples)
+        total = sum(self.samples)
+        return {
+            "count": count,
+            "total_s": round(total, 4),
+            "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p90_ms": round(self.percentile(0.9) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 3),
+            "histogram": self.buckets(),
+        }
+
+
+class Profiler:
+    """Per-stage timings and RPC traffic of one run, reported as JSON.
+
+    RPC traffic is counted where it goes on the wire: by the provider pool
+    (see PooledHTTPProvider.profiler) and by the asyncio engine's session.
+
+    Disabled profilers ignore everything, so instrumented code can call
+    stage() and record() unconditionally.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.rpc = {}  # {method: {"requests", "request_bytes", "response_bytes"}}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds, count=1):
+        """Add `count` samples of `seconds` each to a stage."""
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.stages.setdefault(stage, Histogram())
+            for _ in range(count):
+                histogram.add(seconds)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def count_rpc(self, method, requests=1, request_bytes=0, response_bytes=0):
+        if not self.enabled:
+            return
+        with self.lock:
+            entry = self.rpc.setdefault(method, {"requests": 0, "request_bytes": 0, "response_bytes": 0})
+            entry["requests"] += requests
+            entry["request_bytes"] += request_bytes
+            entry["response_bytes"] += response_bytes
+
+    def report(self):
+        return {
+            "wall_s": round(time.perf_counter() - self.started, 4),
+            "stages": {name: histogram.summary() for name, histogram in sorted(self.stages.items())},
+            "rpc": dict(sorted(self.rpc.items())),
+            "rpc_totals": {
+                key: sum(entry[key] for entry in self.rpc.values())
+                for key in ("requests", "request_bytes", "response_bytes")
+            },
+        }
+
+    def write_report(self, path=PROFILE_REPORT):
+        report = self.report()
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def print_report(self, report=None):
+        report = report or self.report()
+        print(f"\nProfile ({report['wall_s']:.2f}s wall):")
+        for name, stage in report["stages"].items():
+            print(f"  {name:>8}: {stage['count']:6d} x, {stage['total_s']:8.2f}s total, p50 {stage['p50_ms']:9.2f} ms, "
+                  f"p90 {stage['p90_ms']:9.2f} ms, max {stage['max_ms']:9.2f} ms")
+        totals = report["rpc_totals"]
+        print(f"  RPC: {totals['requests']} requests, {totals['request_bytes'] / 1024:.0f} KiB sent, "
+              f"{totals['response_bytes'] / 1024 / 1024:.1f} MiB received")
+        for method, entry in report["rpc"].items():
+            print(f"    {method}: {entry['requests']} requests, {entry['response_bytes'] / 1024 / 1024:.1f} MiB")
+
+
+# The run-wide profiler; enabled by the scraper's --profile flag
+PROFILER = Profiler()
@@ -0,0 +1,275 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3.providers import JSONBaseProvider
+
+from async_scraper import is_rate_limit_error
+
+REQUEST_TIMEOUT = 30
+POOL_MAXSIZE = 32  # keep-alive connections per endpoint, enough for the thread-pooled fetchers
+EWMA_ALPHA = 0.2  # weight of the newest latency sample
+INITIAL_LATENCY = 0.5  # seconds assumed for an endpoint before it has answered anything
+BASE_COOLDOWN = 1.0
+MAX_COOLDOWN = 60.0
+EXTRA_ATTEMPTS = 2  # retries beyond one try per endpoint, waiting for cooled-down endpoints if needed
+PROBE_PROBABILITY = 0.05  # share of requests sent to a uniformly drawn endpoint, so stale latencies get refreshed
+REQUEST_DEADLINE = 5.0  # longest a request waits, in total, for cooled-down endpoints to come back
+
+
+class NoHealthyEndpoint(Exception):
+    """Raised when a request failed on every endpoint of the pool, or none is available in time."""
+
+
+class RequestRejected(Exception):
+    """Raised when an endpoint answers a request with a non-JSON 4xx other than 429.
+
+    The request itself is at fault, so the endpoint is not cooled down and
+    the request is not retried elsewhere.
+    """
+
+
+class Endpoint:
+    """One RPC URL with its keep-alive session, health state and metrics."""
+
+    def __init__(self, url, timeout=REQUEST_TIMEOUT, pool_maxsize=POOL_MAXSIZE):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.latency = INITIAL_LATENCY
+        self.sampled = False  # the first latency sample replaces INITIAL_LATENCY
+        self.in_flight = 0
+        self.failures = 0  # consecutive
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes_received = 0
+        self.busy_seconds = 0.0
+
+    def score(self):
+        # Expected wait: latency grows with the requests already queued on the endpoint
+        return self.latency * (1 + self.in_flight)
+
+    def is_healthy(self, now):
+        return self.down_until <= now
+
+    def post(self, data):
+        """POST a request and return the body; raises HTTPError on 429 and 5xx, RequestRejected on other 4xx."""
+        response = self.session.post(self.url, data=data, timeout=self.timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code >= 400 and "json" not in response.headers.get("Content-Type", ""):
+            raise RequestRejected(f"{response.status_code} {response.reason} from {self.url}")
+        # A JSON 4xx body carries a JSON-RPC error for the caller
+        return response.content
+
+    def metrics(self):
+        return {
+            "url": self.url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "latency_ms": round(self.latency * 1000, 1),
+            "avg_ms": round(self.busy_seconds / self.requests * 1000, 1) if self.requests else None,
+            "bytes_received": self.bytes_received,
+            "healthy": self.is_healthy(time.monotonic()),
+        }
+
+
+class PooledHTTPProvider(JSONBaseProvider):
+    """Sync provider spreading JSON-RPC requests over several HTTP endpoints.
+
+    Each request goes to a healthy endpoint drawn at random with a weight of
+    1 / score, the score being its latency EWMA times its in-flight requests
+    plus one, so fast endpoints get most of the traffic. Endpoints without a
+    latency sample yet are tried first, and a PROBE_PROBABILITY share of
+    requests goes to a uniformly drawn endpoint, so a slow or stale latency
+    estimate is still refreshed. Transport errors,
+    HTTP 429/5xx and JSON-RPC rate limit errors put an endpoint in a
+    cooldown that doubles with every consecutive failure, and the request
+    fails over to the next endpoint. A request waits at most
+    REQUEST_DEADLINE seconds in total for cooled-down endpoints; if none
+    comes back in time it raises NoHealthyEndpoint. Other JSON-RPC errors
+    (such as reverts) are the caller's and are returned as-is. Thread-safe.
+
+    When `profiler` is set, every HTTP request sent, retries included, is
+    counted there along with its duration as an "rpc" sample; answers the
+    pool gives from memory are not.
+    """
+
+    def __init__(self, urls, timeout=REQUEST_TIMEOUT, pool_maxsize=POOL_MAXSIZE):
+        super().__init__()
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            raise ValueError("PooledHTTPProvider needs at least one URL")
+        self.endpoints = [Endpoint(url, timeout, pool_maxsize) for url in urls]
+        self.lock = threading.Lock()
+        self.failovers = 0
+        self.chain_id_response = None
+        self.profiler = None
+
+    def __str__(self):
+        return f"PooledHTTPProvider({', '.join(endpoint.url for endpoint in self.endpoints)})"
+
+    def _choose(self, tried, deadline):
+        """Pick an endpoint not in `tried` and mark it in flight. Returns (endpoint, seconds to wait first).
+
+        Returns (None, 0) when every candidate is cooling down until after `deadline`.
+        """
+        with self.lock:
+            now = time.monotonic()
+            untried = [endpoint for endpoint in self.endpoints if endpoint not in tried] or self.endpoints
+            healthy = [endpoint for endpoint in untried if endpoint.is_healthy(now)]
+            if healthy:
+                unsampled = [endpoint for endpoint in healthy if not endpoint.sampled]
+                if unsampled or random.random() < PROBE_PROBABILITY:
+                    endpoint = random.choice(unsampled or healthy)
+                else:
+                    endpoint = random.choices(healthy, weights=[1 / endpoint.score() for endpoint in healthy])[0]
+                wait = 0.0
+            else:
+                endpoint = min(untried, key=lambda endpoint: endpoint.down_until)
+                if endpoint.down_until > deadline:
+                    return None, 0.0
+                wait = endpoint.down_until - now
+            endpoint.in_flight += 1
+            return endpoint, wait
+
+    def _record(self, endpoint, elapsed, size=0, error=None, throttled=False):
+        with self.lock:
+            endpoint.in_flight -= 1
+            endpoint.requests += 1
+            endpoint.busy_seconds += elapsed
+            if error is None:
+                alpha = EWMA_ALPHA if endpoint.sampled else 1.0
+                endpoint.latency += alpha * (elapsed - endpoint.latency)
+                endpoint.sampled = True
+                endpoint.bytes_received += size
+                endpoint.failures = 0
+                return
+            endpoint.errors += 1
+            endpoint.throttled += throttled
+            endpoint.failures += 1
+            cooldown = min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** (endpoint.failures - 1))
+            endpoint.down_until = time.monotonic() + cooldown
+
+    def _count(self, method, elapsed, data, raw=b""):
+        if self.profiler is not None:
+            self.profiler.record("rpc", elapsed)
+            self.profiler.count_rpc(method, 1, len(data), len(raw))
+
+    def _post(self, data, method, label=None):
+        """POST an encoded request or batch, failing over between endpoints. Returns the decoded response."""
+        label = label or method
+        tried = []
+        last_error = None
+        deadline = time.monotonic() + REQUEST_DEADLINE
+        for attempt in range(len(self.endpoints) + EXTRA_ATTEMPTS):
+            endpoint, wait = self._choose(tried, deadline)
+            if endpoint is None:
+                raise NoHealthyEndpoint(f"{label}: every endpoint is cooling down, last error: {last_error}")
+            if wait > 0:
+                time.sleep(wait)
+            if attempt:
+                self.failovers += 1
+            tried.append(endpoint)
+            started = time.monotonic()
+            raw = b""
+            try:
+                raw = endpoint.post(data)
+                response = self.decode_rpc_response(raw)
+            except RequestRejected:
+                self._record(endpoint, time.monotonic() - started)
+                raise
+            except (requests.RequestException, ValueError) as e:
+                # HTTPError messages start with the status code, so 429s are recognised too
+                self._record(endpoint, time.monotonic() - started, error=e, throttled=is_rate_limit_error(e))
+                last_error = e
+                continue
+            finally:
+                self._count(method, time.monotonic() - started, data, raw)
+            items = response if isinstance(response, list) else [response]
+            error = next((item["error"] for item in items
+                          if isinstance(item, dict) and item.get("error") and is_rate_limit_error(item["error"])), None)
+            if error:
+                self._record(endpoint, time.monotonic() - started, error=error, throttled=True)
+                last_error = error
+                continue
+            self._record(endpoint, time.monotonic() - started, size=len(raw))
+            return response
+        raise NoHealthyEndpoint(f"{label} failed on every endpoint, last error: {last_error}")
+
+    def make_request(self, method, params):
+        # web3 asks for the chain ID before every contract call; it never changes, so ask once
+        if method == "eth_chainId":
+            if self.chain_id_response is None or "result" not in self.chain_id_response:
+                self.chain_id_response = self._post(self.encode_rpc_request(method, params), method)
+            return self.chain_id_response
+        return self._post(self.encode_rpc_request(method, params), method)
+
+    def make_batch_request(self, batch_requests):
+        """Send [(method, params), ...] as one JSON-RPC batch; responses come back in request order.
+
+        Responses are matched to requests by id. If any is missing, the
+        batch fails as a whole with a single error response.
+        """
+        # Encoded here rather than with encode_batch_rpc_request, which web3 6 does not have
+        encoded = [self.encode_rpc_request(method, params) for method, params in batch_requests]
+        methods = ",".join(sorted({method for method, _ in batch_requests}))
+        response = self._post(b"[" + b",".join(encoded) + b"]", f"batch:{methods}", f"batch of {len(batch_requests)}")
+        if not isinstance(response, list):
+            return response
+        by_id = {item.get("id"): item for item in response if isinstance(item, dict)}
+        responses = [by_id.get(json.loads(request)["id"]) for request in encoded]
+        if None in responses:
+            missing = responses.count(None)
+            return {"jsonrpc": "2.0", "id": None,
+                    "error": {"code": -32603, "message": f"batch response is missing {missing} of {len(encoded)} items"}}
+        return responses
+
+    def is_connected(self, show_traceback=False):
+        try:
+            return "result" in self.make_request("eth_chainId", [])
+        except NoHealthyEndpoint:
+            if show_traceback:
+                raise
+            return False
+
+    def metrics(self):
+        with self.lock:
+            return [endpoint.metrics() for endpoint in self.endpoints]
+
+    def print_metrics(self):
+        print(f"RPC pool: {self.failovers} failovers")
+        for m in self.metrics():
+            print(f"  {m['url']}: {m['requests']} requests, {m['errors']} errors ({m['throttled']} throttled), "
+                  f"latency {m['latency_ms']} ms (avg {m['avg_ms']} ms), {m['bytes_received'] / 1024:.0f} KiB, "
+                  f"{'healthy' if m['healthy'] else 'cooling down'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send test requests through an RPC pool and print per-endpoint metrics")
+    parser.add_argument("urls", nargs="+", help="JSON-RPC endpoints, e.g. local mock servers")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--method", default="eth_blockNumber")
+    args = parser.parse_args()
+
+    pool = PooledHTTPProvider(args.urls)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        responses = list(executor.map(lambda _: pool.make_request(args.method, []), range(args.requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{len(responses)} requests in {elapsed:.2f}s ({len(responses) / elapsed:.0f} req/s)")
+    pool.print_metrics()
@@ -0,0 +1,173 @@
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+INDEX_FILE = "trait_index.bin"
+INDEX_MAGIC = b"BCTIDX01"
+# magic, directory offset, directory length
+HEADER = struct.Struct("<8sQQ")
+
+
+def value_key(value):
+    """Index key of an attribute value: strings as-is, everything else as JSON (3, true, null)."""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def intersect(postings):
+    """Intersect sorted token ID sequences, probing the larger ones with binary search."""
+    postings = sorted(postings, key=len)
+    if not postings:
+        return []
+    result = list(postings[0])
+    for other in postings[1:]:
+        kept = []
+        low = 0
+        for token_id in result:
+            low = bisect.bisect_left(other, token_id, low)
+            if low == len(other):
+                break
+            if other[low] == token_id:
+                kept.append(token_id)
+        result = kept
+        if not result:
+            break
+    return result
+
+
+class TraitIndex:
+    """Inverted index from (trait type, value) to the sorted IDs of tokens carrying it.
+
+    Postings are compact uint32 arrays. An index built in memory can be saved
+    to a single file; TraitIndex.load() memory-maps that file and only parses
+    its small directory, so lookups start without reading the postings.
+    """
+
+    def __init__(self, postings=None, mapped=None):
+        self.postings = postings or {}  # {trait type: {value key: sorted token IDs}}
+        self._mapped = mapped
+
+    @classmethod
+    def build(cls, items):
+        """Build the index from (token_id, result) pairs such as ResultStore.items()."""
+        postings = {}
+        for token_id, result in items:
+            attributes = result.get("attributes") if isinstance(result, dict) else None
+            if not isinstance(attributes, dict):
+                continue
+            for trait_type, value in attributes.items():
+                postings.setdefault(trait_type, {}).setdefault(value_key(value), []).append(int(token_id))
+        return cls({
+            trait_type: {key: array("I", sorted(token_ids)) for key, token_ids in values.items()}
+            for trait_type, values in postings.items()
+        })
+
+    def traits(self):
+        return sorted(self.postings)
+
+    def values(self, trait_type):
+        """Return {value key: token count} for one trait type."""
+        return {key: len(token_ids) for key, token_ids in self.postings.get(trait_type, {}).items()}
+
+    def lookup(self, trait_type, value):
+        """Return the sorted token IDs with trait_type == value."""
+        return self.postings.get(trait_type, {}).get(value_key(value), array("I"))
+
+    def query(self, **conditions):
+        """Return the sorted token IDs matching every trait_type=value condition."""
+        return self.query_pairs(conditions.items())
+
+    def query_pairs(self, conditions):
+        return intersect([self.lookup(trait_type, value) for trait_type, value in conditions])
+
+    def save(self, path=INDEX_FILE):
+        # Write a new file and rename it over the old one: readers may have the old file memory-mapped,
+        # and truncating it in place would kill them with SIGBUS
+        directory = {}
+        offset = HEADER.size
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"\0" * HEADER.size)
+            for trait_type, values in sorted(self.postings.items()):
+                directory[trait_type] = {}
+                for key, token_ids in sorted(values.items()):
+                    token_ids = array("I", token_ids)
+                    if sys.byteorder != "little":
+                        token_ids.byteswap()
+                    f.write(token_ids.tobytes())
+                    directory[trait_type][key] = [offset, len(token_ids)]
+                    offset += len(token_ids) * token_ids.itemsize
+            encoded = json.dumps(directory).encode("utf-8")
+            f.write(encoded)
+            f.seek(0)
+            f.write(HEADER.pack(INDEX_MAGIC, offset, len(encoded)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        """Memory-map an index file; postings are zero-copy views into the mapping."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, directory_offset, directory_length = HEADER.unpack_from(mapped, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a trait index file")
+        directory = json.loads(mapped[directory_offset:directory_offset + directory_length].decode("utf-8"))
+        view = memoryview(mapped)
+        postings = {}
+        for trait_type, values in directory.items():
+            postings[trait_type] = {}
+            for key, (offset, count) in values.items():
+                token_ids = view[offset:offset + count * 4]
+                if sys.byteorder == "little":
+                    token_ids = token_ids.cast("I")
+                else:
+                    token_ids = array("I", token_ids.tobytes())
+                    token_ids.byteswap()
+                postings[trait_type][key] = token_ids
+        return cls(postings, mapped)
+
+
+def build_index_from_store(store, path=INDEX_FILE):
+    index = TraitIndex.build(store.items())
+    index.save(path)
+    return index
+
+
+def _parse_condition(condition):
+    trait_type, sep, value = condition.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected TRAIT=VALUE, got '{condition}'")
+    return trait_type.strip(), value.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the trait index of Buterin Cards")
+    parser.add_argument("--index", default=INDEX_FILE, help=f"Index file (default: {INDEX_FILE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Build the index from the result store")
+    build_parser.add_argument("--db", help="Result store to index (default: the scraper's store)")
+    query_parser = commands.add_parser("query", help="List tokens matching all TRAIT=VALUE conditions")
+    query_parser.add_argument("conditions", nargs="+", type=_parse_condition, metavar="TRAIT=VALUE")
+    values_parser = commands.add_parser("values", help="List the values of a trait (or all traits) with counts")
+    values_parser.add_argument("trait", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from result_store import ResultStore, RESULTS_DB
+        with ResultStore(args.db or RESULTS_DB) as store:
+            index = build_index_from_store(store, args.index)
+        print(f"Indexed {sum(len(values) for values in index.postings.values())} values "
+              f"of {len(index.postings)} traits into {args.index}")
+    elif args.command == "query":
+        token_ids = TraitIndex.load(args.index).query_pairs(args.conditions)
+        print(f"{len(token_ids)} tokens: {' '.join(str(token_id) for token_id in token_ids)}")
+    else:
+        index = TraitIndex.load(args.index)
+        for trait_type in [args.trait] if args.trait else index.traits():
+            print(f"{trait_type}:")
+            for key, count in sorted(index.values(trait_type).items(), key=lambda item: -item[1]):
+                print(f"  {key}: {count}")
@@ -0,0 +1,154 @@
+import json
+import os
+import sqlite3
+
+RESULTS_DB = "token_results.db"
+RESULTS_JSON = "token_quote_mapping.json"
+QUOTE_MAPPING_JSON = "quote_token_mapping.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    quote_title TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS tokens_quote_title ON tokens (quote_title);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def result_quote_title(result):
+    """Return the "Quote Title" attribute of a decoded result, or None."""
+    attributes = result.get("attributes")
+    if isinstance(attributes, dict):
+        return attributes.get("Quote Title")
+    return None
+
+
+def write_json_atomic(path, data):
+    # Write next to the target and rename so a crash never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ResultStore:
+    """SQLite-backed store of per-token scrape results.
+
+    Each result is one row keyed by token_id with its quote title in an
+    indexed column, so writing a batch only touches the rows that changed
+    and quote lookups never scan the whole collection. Every put() call is
+    a single transaction; a crash loses at most the batch being written.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def __contains__(self, token_id):
+        row = self.conn.execute("SELECT 1 FROM tokens WHERE token_id = ?", (int(token_id),)).fetchone()
+        return row is not None
+
+    def get(self, token_id):
+        row = self.conn.execute("SELECT data FROM tokens WHERE token_id = ?", (int(token_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def token_ids(self):
+        """Return the set of token IDs that have a stored result (including errors)."""
+        return {row[0] for row in self.conn.execute("SELECT token_id FROM tokens")}
+
+    def succeeded_ids(self):
+        """Return the set of token IDs whose stored result is not an error."""
+        return {row[0] for row in self.conn.execute("SELECT token_id FROM tokens WHERE error IS NULL")}
+
+    def items(self):
+        """Yield (token_id, result) pairs in token ID order."""
+        for token_id, data in self.conn.execute("SELECT token_id, data FROM tokens ORDER BY token_id"):
+            yield token_id, json.loads(data)
+
+    def put(self, results):
+        """Insert or replace results given as {token_id: result} in one transaction."""
+        rows = [
+            (int(token_id), json.dumps(result), result_quote_title(result), result.get("error"))
+            for token_id, result in results.items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tokens (token_id, data, quote_title, error) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def tokens_for_quote(self, quote_title):
+        rows = self.conn.execute(
+            "SELECT token_id FROM tokens WHERE quote_title = ? ORDER BY token_id", (quote_title,))
+        return [row[0] for row in rows]
+
+    def token_quotes(self):
+        """Return {token_id: quote title} for every token that has one."""
+        rows = self.conn.execute("SELECT token_id, quote_title FROM tokens WHERE quote_title IS NOT NULL")
+        return dict(rows.fetchall())
+
+    def quote_rows(self):
+        """Yield (token_id, quote title) for every token with a quote, in token ID order."""
+        yield from self.conn.execute(
+            "SELECT token_id, quote_title FROM tokens WHERE quote_title IS NOT NULL ORDER BY token_id")
+
+    def quote_mapping(self):
+        """Return {quote title: [token IDs]} with token IDs in ascending order."""
+        quote_mapping = {}
+        for token_id, quote_title in self.quote_rows():
+            quote_mapping.setdefault(quote_title, []).append(token_id)
+        return quote_mapping
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def import_json(self, path=RESULTS_JSON):
+        """Load results from an existing token_quote_mapping.json into the store."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0
+        self.put(results)
+        return len(results)
+
+    def export_json(self, results_path=RESULTS_JSON, mapping_path=QUOTE_MAPPING_JSON):
+        """Write the results and quote mapping in the existing JSON file formats."""
+        write_json_atomic(results_path, {str(token_id): result for token_id, result in self.items()})
+        write_json_atomic(mapping_path, self.quote_mapping())
+
+
+def open_store(path=RESULTS_DB, legacy_json=RESULTS_JSON):
+    """Open the result store, importing a legacy JSON results file the first time."""
+    store = ResultStore(path)
+    if len(store) == 0:
+        imported = store.import_json(legacy_json)
+        if imported:
+            print(f"Imported {imported} existing results from {legacy_json} into {path}")
+    return store
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+
+from web3.providers import JSONBaseProvider
+
+from multicall import is_revert_error
+
+RPC_CACHE_DIR = ".rpc_cache"
+RPC_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB; tokenURI responses embed the card images
+CACHE_MODES = ("off", "record", "replay")
+
+# Methods whose result only depends on their parameters once the block is pinned
+CACHEABLE_METHODS = ("eth_call", "eth_getCode", "eth_getLogs", "eth_chainId")
+# Block tags whose meaning moves with the chain; recorded, but never served in record mode
+MOVING_BLOCK_TAGS = ("latest", "pending", "safe", "finalized")
+
+
+class RPCCacheMiss(Exception):
+    """Raised in replay mode when a request has not been recorded."""
+
+
+def _request_key(method, params):
+    """Return the cache key of a request and whether it refers to a moving block tag."""
+    params = list(params or [])
+    if method == "eth_call":
+        call, block = params[0], params[1] if len(params) > 1 else "latest"
+        parts = [method, str(call.get("to", "")).lower(), str(call.get("data", call.get("input", ""))).lower(), block]
+    elif method == "eth_getCode":
+        block = params[1] if len(params) > 1 else "latest"
+        parts = [method, str(params[0]).lower(), block]
+    elif method == "eth_getLogs":
+        log_filter = params[0]
+        block = log_filter.get("toBlock", "latest")
+        parts = [method, log_filter]
+    else:
+        block = None
+        parts = [method, params]
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest(), block in MOVING_BLOCK_TAGS
+
+
+class RPCCache:
+    """On-disk cache of JSON-RPC results, one file per request hash, with size-bounded LRU eviction.
+
+    A file's mtime is refreshed on every hit, so eviction removes the least
+    recently used entries first.
+    """
+
+    def __init__(self, cache_dir=RPC_CACHE_DIR, max_bytes=RPC_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if filename.endswith(".json"):
+                    yield os.path.join(root, filename)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        if os.path.exists(path):
+            self.size -= os.path.getsize(path)
+        os.replace(tmp_path, path)
+        self.size += os.path.getsize(path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_ratio=0.9):
+        """Delete least recently used entries until the cache is under target_ratio * max_bytes."""
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        for path in entries:
+            if self.size <= self.max_bytes * target_ratio:
+                break
+            self.size -= os.path.getsize(path)
+            os.remove(path)
+
+
+class CachingProvider(JSONBaseProvider):
+    """Provider that records JSON-RPC results to an RPCCache and can replay them offline.
+
+    In "record" mode, requests against a pinned block are served from the
+    cache when possible and recorded otherwise; requests against moving tags
+    such as "latest" always go upstream but are still recorded. Reverts are
+    recorded and replayed like results; other errors are never cached. In
+    "replay" mode every request must come from the cache and no upstream is
+    needed.
+    """
+
+    def __init__(self, upstream=None, mode="record", cache_dir=RPC_CACHE_DIR, max_bytes=RPC_CACHE_MAX_BYTES):
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown RPC cache mode: {mode}")
+        if mode == "record" and upstream is None:
+            raise ValueError("Record mode needs an upstream provider")
+        self.upstream = upstream
+        self.mode = mode
+        self.cache = RPCCache(cache_dir, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached_response(self, method, params):
+        """Return the cached response of a request, None if it must go upstream, or raise in replay mode."""
+        if method in CACHEABLE_METHODS:
+            key, moving = _request_key(method, params)
+            if self.mode == "replay" or not moving:
+                result = self.cache.get(key)
+                if isinstance(result, dict) and "error" in result:
+                    self.hits += 1
+                    return {"jsonrpc": "2.0", "id": 0, "error": result["error"]}
+                if result is not None:
+                    self.hits += 1
+                    return {"jsonrpc": "2.0", "id": 0, "result": result}
+        if self.mode == "replay":
+            raise RPCCacheMiss(f"{method} request not found in RPC cache {self.cache.cache_dir}")
+        return None
+
+    def _record(self, method, params, response):
+        self.misses += 1
+        if method not in CACHEABLE_METHODS:
+            return
+        if "result" in response and response.get("error") is None:
+            self.cache.put(_request_key(method, params)[0], response["result"])
+        elif is_revert_error(response.get("error")):
+            # Reverts are as deterministic as results once the block is fixed; the results of cacheable
+            # methods are never objects, so {"error": ...} entries can't be mistaken for one
+            self.cache.put(_request_key(method, params)[0], {"error": response["error"]})
+
+    def make_request(self, method, params):
+        response = self._cached_response(method, params)
+        if response is None:
+            response = self.upstream.make_request(method, params)
+            self._record(method, params, response)
+        return response
+
+    def make_batch_request(self, batch_requests):
+        """Serve what the cache holds and send the remaining requests upstream as one batch."""
+        responses = [self._cached_response(method, params) for method, params in batch_requests]
+        missing = [index for index, response in enumerate(responses) if response is None]
+        if missing:
+            if not hasattr(self.upstream, "make_batch_request"):
+                raise NotImplementedError(f"{self.upstream} does not support batch requests")
+            upstream_responses = self.upstream.make_batch_request([batch_requests[index] for index in missing])
+            if not isinstance(upstream_responses, list):
+                return upstream_responses  # a single error for the whole batch
+            for index, response in zip(missing, upstream_responses):
+                self._record(*batch_requests[index], response)
+                responses[index] = response
+        return responses
+
+    def is_connected(self, show_traceback=False):
+        return self.mode == "replay" or self.upstream.is_connected(show_traceback)
+
+
+def provider_from_env(rpc_urls=None):
+    """Build the provider described by RPC_CACHE_MODE / RPC_CACHE_DIR / RPC_CACHE_MAX_MB.
+
+    `rpc_urls` is one URL or a list of them, served by a PooledHTTPProvider,
+    which is returned directly when caching is off.
+    """
+    from provider_pool import PooledHTTPProvider
+
+    mode = os.getenv("RPC_CACHE_MODE", "off")
+    if mode not in CACHE_MODES:
+        raise ValueError(f"RPC_CACHE_MODE must be one of {', '.join(CACHE_MODES)}, got {mode}")
+    upstream = PooledHTTPProvider(rpc_urls) if rpc_urls else None
+    if mode == "off":
+        return upstream
+    cache_dir = os.getenv("RPC_CACHE_DIR", RPC_CACHE_DIR)
+    max_bytes = int(os.getenv("RPC_CACHE_MAX_MB", RPC_CACHE_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+    return CachingProvider(upstream, mode=mode, cache_dir=cache_dir, max_bytes=max_bytes)
+
+
+def pinned_block_from_env():
+    """Return PINNED_BLOCK as an int, or "latest" if it is not set."""
+    block = os.getenv("PINNED_BLOCK")
+    return int(block) if block else "latest"
@@ -0,0 +1,328 @@
+import argparse
+import os
+import socket
+import sqlite3
+import time
+
+from result_store import RESULTS_DB
+
+LEASE_SECONDS = 300  # claimed shards/tokens return to the pool if their worker is silent this long
+SHARD_SIZE = 100
+CLAIM_BATCH_SIZE = 50
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+MAX_ATTEMPTS = 8
+
+PENDING, IN_FLIGHT, DONE, FAILED = "pending", "in_flight", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work (
+    token_id INTEGER PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL,
+    worker TEXT,
+    lease_until REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS work_shard_state ON work (shard, state);
+CREATE TABLE IF NOT EXISTS shards (
+    shard INTEGER PRIMARY KEY,
+    start_id INTEGER NOT NULL,
+    end_id INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL
+);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def retry_delay(attempts):
+    """Exponential backoff before retry number `attempts`, capped at RETRY_MAX_SECONDS."""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+class WorkScheduler:
+    """Persistent per-token work queue split into claimable shards.
+
+    Every token is pending, in_flight, done or failed. Workers claim a whole
+    shard, then batches of tokens inside it, under a lease; a worker that dies
+    simply lets its leases expire and the work is handed out again, while a
+    restarted worker with the same ID picks up its own in-flight tokens right
+    away. Failed tokens are retried with exponential backoff until
+    MAX_ATTEMPTS is reached. All state changes are single SQLite
+    transactions, so several processes can share one database.
+    """
+
+    def __init__(self, path=RESULTS_DB, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same rows
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def plan(self, start_id, end_id, shard_size=SHARD_SIZE, done_ids=(), failed_ids=()):
+        """Add tokens start_id..end_id to the queue, grouped into shards of `shard_size` consecutive IDs.
+
+        Tokens already queued keep their state. `done_ids` are recorded as done
+        and `failed_ids` as failed and immediately retryable, e.g. from the
+        result store of an earlier run. Returns the number of tokens added.
+        """
+        done_ids, failed_ids = set(done_ids), set(failed_ids)
+        conn = self._transaction()
+        try:
+            before = conn.execute("SELECT COUNT(*) FROM work").fetchone()[0]
+            for shard_start in range(start_id - start_id % shard_size, end_id + 1, shard_size):
+                shard = shard_start // shard_size
+                conn.execute("INSERT OR IGNORE INTO shards (shard, start_id, end_id) VALUES (?, ?, ?)",
+                             (shard, shard_start, shard_start + shard_size - 1))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO work (token_id, shard, state, next_attempt) VALUES (?, ?, ?, ?)",
+                    [(token_id, shard,
+                      DONE if token_id in done_ids else FAILED if token_id in failed_ids else PENDING, 0)
+                     for token_id in range(max(shard_start, start_id), min(shard_start + shard_size - 1, end_id) + 1)])
+            added = conn.execute("SELECT COUNT(*) FROM work").fetchone()[0] - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def claim_shard(self, worker, shards=None):
+        """Claim a shard that has runnable work and no live lease. Returns the shard number or None.
+
+        `shards` optionally restricts the claim, e.g. to a static split across machines.
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            rows = conn.execute(
+                "SELECT s.shard FROM shards s WHERE (s.worker IS NULL OR s.worker = ? OR s.lease_until < ?) "
+                "AND EXISTS (SELECT 1 FROM work w WHERE w.shard = s.shard AND ("
+                "  (w.state IN (?, ?) AND w.next_attempt <= ?)"
+                "  OR (w.state = ? AND (w.worker = ? OR w.lease_until < ?)))) "
+                "ORDER BY (s.worker = ?) DESC, s.shard",
+                (worker, now, PENDING, FAILED, now, IN_FLIGHT, worker, now, worker)).fetchall()
+            shard = next((row[0] for row in rows if shards is None or row[0] in shards), None)
+            if shard is not None:
+                conn.execute("UPDATE shards SET worker = ?, lease_until = ? WHERE shard = ?",
+                             (worker, now + self.lease_seconds, shard))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return shard
+
+    def claim_tokens(self, worker, shard, limit=CLAIM_BATCH_SIZE):
+        """Mark up to `limit` runnable tokens of a claimed shard in flight for `worker` and return their IDs."""
+        now = time.time()
+        conn = self._transaction()
+        try:
+            token_ids = [row[0] for row in conn.execute(
+                "SELECT token_id FROM work WHERE shard = ? AND ("
+                "  (state IN (?, ?) AND next_attempt <= ?)"
+                "  OR (state = ? AND (worker = ? OR lease_until < ?))) "
+                "ORDER BY token_id LIMIT ?",
+                (shard, PENDING, FAILED, now, IN_FLIGHT, worker, now, limit))]
+            lease_until = now + self.lease_seconds
+            conn.executemany("UPDATE work SET state = ?, worker = ?, lease_until = ? WHERE token_id = ?",
+                             [(IN_FLIGHT, worker, lease_until, token_id) for token_id in token_ids])
+            conn.execute("UPDATE shards SET lease_until = ? WHERE shard = ? AND worker = ?",
+                         (lease_until, shard, worker))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return token_ids
+
+    def mark_done(self, token_ids):
+        conn = self._transaction()
+        try:
+            conn.executemany("UPDATE work SET state = ?, worker = NULL, lease_until = NULL, last_error = NULL "
+                             "WHERE token_id = ?", [(DONE, token_id) for token_id in token_ids])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def mark_failed(self, errors):
+        """Record {token_id: error}; each token is retried after an exponential backoff until MAX_ATTEMPTS.
+
+        Token IDs that are not queued are skipped.
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            for token_id, error in errors.items():
+                row = conn.execute("SELECT attempts FROM work WHERE token_id = ?", (token_id,)).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                next_attempt = now + retry_delay(attempts) if attempts < MAX_ATTEMPTS else None
+                conn.execute("UPDATE work SET state = ?, attempts = ?, next_attempt = ?, worker = NULL, "
+                             "lease_until = NULL, last_error = ? WHERE token_id = ?",
+                             (FAILED, attempts, next_attempt, str(error), token_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_shard(self, worker, shard):
+        conn = self._transaction()
+        try:
+            conn.execute("UPDATE shards SET worker = NULL, lease_until = NULL WHERE shard = ? AND worker = ?",
+                         (shard, worker))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def next_retry(self):
+        """Return the earliest time a failed token becomes runnable again, or None."""
+        row = self.conn.execute("SELECT MIN(next_attempt) FROM work WHERE state = ? AND next_attempt IS NOT NULL",
+                                (FAILED,)).fetchone()
+        return row[0]
+
+    def status(self):
+        """Return {state: token count}, with failed tokens that ran out of attempts counted as 'gave_up'."""
+        counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM work GROUP BY state").fetchall())
+        gave_up = self.conn.execute("SELECT COUNT(*) FROM work WHERE state = ? AND next_attempt IS NULL",
+                                    (FAILED,)).fetchone()[0]
+        if gave_up:
+            counts["gave_up"] = gave_up
+        return counts
+
+
+def parse_shard_split(value):
+    """Parse INDEX/COUNT (e.g. 0/3) into a predicate over shard numbers."""
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Expected INDEX/COUNT with 0 <= INDEX < COUNT, got {value}")
+    return index, count
+
+
+def run_worker(scheduler, store, fetch_batch, decode, worker, shard_split=None, batch_size=CLAIM_BATCH_SIZE,
+               wait_for_retries=False):
+    """Claim shards and tokens until no runnable work is left, storing results and recording failures."""
+    shards = None
+    if shard_split is not None:
+        index, count = shard_split
+        all_shards = [row[0] for row in scheduler.conn.execute("SELECT shard FROM shards")]
+        shards = {shard for shard in all_shards if shard % count == index}
+
+    processed = 0
+    while True:
+        shard = scheduler.claim_shard(worker, shards)
+        if shard is None:
+            next_retry = scheduler.next_retry()
+            if wait_for_retries and next_retry is not None:
+                time.sleep(max(1.0, next_retry - time.time()))
+                continue
+            return processed
+        while True:
+            token_ids = scheduler.claim_tokens(worker, shard, batch_size)
+            if not token_ids:
+                break
+            try:
+                token_uris, errors = fetch_batch(token_ids)
+                results, failures = {}, dict(errors)
+                for token_id, token_uri in token_uris.items():
+                    token_id, result = decode(token_id, token_uri=token_uri)
+                    if "error" in result:
+                        failures[token_id] = result["error"]
+                    else:
+                        results[token_id] = result
+            except Exception as e:
+                # An RPC outage fails the whole batch; it is retried after the usual backoff
+                results, failures = {}, {token_id: str(e) for token_id in token_ids}
+            for token_id in token_ids:
+                if token_id not in results and token_id not in failures:
+                    failures[token_id] = "tokenURI not fetched"
+            # Results are committed before the tokens are marked done, so a crash in between only repeats work
+            store.put(results)
+            scheduler.mark_done(results)
+            scheduler.mark_failed(failures)
+            processed += len(token_ids)
+            print(f"[{worker}] shard {shard}: {len(results)} done, {len(failures)} failed")
+        scheduler.release_shard(worker, shard)
+
+
+def _worker_process(worker, args):
+    from get_buterin_token_uris import fetch_token_batch, get_token_metadata
+    from result_store import ResultStore
+    from stream_decode import decode_token_uri_streaming
+
+    decode = decode_token_uri_streaming if args.stream_decode else get_token_metadata
+    with WorkScheduler(args.db, args.lease) as scheduler, ResultStore(args.db) as store:
+        processed = run_worker(scheduler, store, lambda token_ids: fetch_token_batch(token_ids, use_multicall=True),
+                               decode, worker, args.shard, args.batch_size, args.wait)
+    print(f"[{worker}] finished after {processed} tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable, sharded scraping of token metadata")
+    parser.add_argument("--db", default=RESULTS_DB, help=f"Database shared by the queue and results (default: {RESULTS_DB})")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help=f"Seconds before work claimed by a silent worker is handed out again (default: {LEASE_SECONDS})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = commands.add_parser("plan", help="Queue a token range, split into shards")
+    plan_parser.add_argument("--start", type=int, default=0)
+    plan_parser.add_argument("--end", type=int, default=2014)
+    plan_parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+
+    work_parser = commands.add_parser("work", help="Claim shards and process tokens until the queue is drained")
+    work_parser.add_argument("--worker-id", default=None,
+                             help="Stable ID; reuse it after a crash to resume that worker's in-flight tokens")
+    work_parser.add_argument("--processes", type=int, default=1, help="Worker processes on this machine")
+    work_parser.add_argument("--shard", type=parse_shard_split, metavar="INDEX/COUNT",
+                             help="Only claim shards with shard %% COUNT == INDEX (split across machines)")
+    work_parser.add_argument("--batch-size", type=int, default=CLAIM_BATCH_SIZE)
+    work_parser.add_argument("--stream-decode", action="store_true")
+    work_parser.add_argument("--wait", action="store_true", help="Sleep until failed tokens are due instead of exiting")
+
+    commands.add_parser("status", help="Show token counts per state")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        from result_store import ResultStore
+        with ResultStore(args.db) as store:
+            done_ids = store.succeeded_ids()
+            failed_ids = store.token_ids() - done_ids
+        with WorkScheduler(args.db, args.lease) as scheduler:
+            added = scheduler.plan(args.start, args.end, args.shard_size, done_ids, failed_ids)
+            print(f"Queued {added} new tokens; status: {scheduler.status()}")
+    elif args.command == "work":
+        worker_id = args.worker_id or default_worker_id()
+        if args.processes == 1:
+            _worker_process(worker_id, args)
+        else:
+            import multiprocessing
+            workers = [multiprocessing.Process(target=_worker_process, args=(f"{worker_id}/{index}", args))
+                       for index in range(args.processes)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join()
+    else:
+        with WorkScheduler(args.db, args.lease) as scheduler:
+            print(scheduler.status())
@@ -0,0 +1,66 @@
+import eth_abi
+from eth_utils import function_signature_to_4byte_selector
+from web3.providers import JSONBaseProvider
+
+AGGREGATE3 = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+TOKEN_URI = function_signature_to_4byte_selector("tokenURI(uint256)")
+REVERT = {"code": 3, "message": "execution reverted", "data": "0x"}
+
+
+class StandInNode(JSONBaseProvider):
+    """In-process node answering tokenURI calls, directly and through Multicall3 aggregate3.
+
+    Used by the offline benchmarks and the tests. `token_uris` is a
+    {token_id: tokenURI} dict or a function of (token_id, block) returning
+    the tokenURI or None, `block` being an int or None for "latest"; tokens
+    without one revert. Tokens in `reverting` always revert, and tokens in
+    `fail_in_multicall` fail as aggregate3 sub-calls but succeed as plain
+    calls. aggregate3 batches of more than `max_batch` calls are rejected as
+    too large, and with `down` set every request fails like an unreachable
+    endpoint. The sizes of aggregate3 batches and the token IDs of plain
+    calls are recorded in `aggregate3_sizes` and `single_calls`.
+    """
+
+    def __init__(self, token_uris, reverting=(), fail_in_multicall=(), max_batch=None, down=False):
+        super().__init__()
+        self.token_uris = token_uris if callable(token_uris) else lambda token_id, block: token_uris.get(token_id)
+        self.reverting = set(reverting)
+        self.fail_in_multicall = set(fail_in_multicall)
+        self.max_batch = max_batch
+        self.down = down
+        self.aggregate3_sizes = []
+        self.single_calls = []
+
+    def _call(self, data, block, in_multicall):
+        """Return (token ID or None, tokenURI or None) of a tokenURI call."""
+        if data[:4] != TOKEN_URI:
+            return None, None
+        token_id = eth_abi.decode(["uint256"], data[4:])[0]
+        if token_id in self.reverting or (in_multicall and token_id in self.fail_in_multicall):
+            return token_id, None
+        return token_id, self.token_uris(token_id, block)
+
+    def make_request(self, method, params):
+        if self.down:
+            raise ConnectionError("Connection refused")
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x1"}
+        if method != "eth_call":
+            raise NotImplementedError(method)
+        block = None if params[1] == "latest" else int(params[1], 16)
+        data = bytes.fromhex(params[0]["data"][2:])
+        if data[:4] == AGGREGATE3:
+            calls = eth_abi.decode(["(address,bool,bytes)[]"], data[4:])[0]
+            self.aggregate3_sizes.append(len(calls))
+            if self.max_batch is not None and len(calls) > self.max_batch:
+                return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": "response size exceeded"}}
+            results = []
+            for _, _, call_data in calls:
+                _, token_uri = self._call(call_data, block, in_multicall=True)
+                results.append((False, b"") if token_uri is None else (True, eth_abi.encode(["string"], [token_uri])))
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x" + eth_abi.encode(["(bool,bytes)[]"], [results]).hex()}
+        token_id, token_uri = self._call(data, block, in_multicall=False)
+        self.single_calls.append(token_id)
+        if token_uri is None:
+            return {"jsonrpc": "2.0", "id": 0, "error": REVERT}
+        return {"jsonrpc": "2.0", "id": 0, "result": "0x" + eth_abi.encode(["string"], [token_uri]).hex()}
@@ -0,0 +1,259 @@
+import base64
+import codecs
+import json
+import re
+import urllib.parse
+
+BASE64_PREFIX = "data:application/json;base64,"
+URL_ENCODED_PREFIX = "data:application/json;charset=UTF-8,"
+CHUNK_SIZE = 64 * 1024  # characters of the tokenURI decoded per step
+
+DESCRIPTION_LIMIT = 200
+IMAGE_LIMIT = 100
+# A JSON string escape is at most 12 raw characters per decoded character (a
+# \uXXXX\uXXXX surrogate pair), so this many raw characters always cover `limit`
+# decoded ones
+RAW_CHARS_PER_CHAR = 12
+
+_CONTAINER_CHARS = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+
+def _base64_chunks(token_uri, start, chunk_size=CHUNK_SIZE):
+    """Yield the decoded text of a base64 payload a chunk at a time."""
+    chunk_size -= chunk_size % 4
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for offset in range(start, len(token_uri), chunk_size):
+        yield decoder.decode(base64.b64decode(token_uri[offset:offset + chunk_size]))
+    yield decoder.decode(b"", final=True)
+
+
+def _url_encoded_chunks(token_uri, start, chunk_size=CHUNK_SIZE):
+    """Yield the decoded text of a percent-encoded payload a chunk at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    offset = start
+    while offset < len(token_uri):
+        end = min(offset + chunk_size, len(token_uri))
+        # Never split a %XX escape across chunks
+        escape = token_uri.rfind("%", max(offset, end - 2), end)
+        if escape != -1 and end < len(token_uri):
+            end = escape
+        yield decoder.decode(urllib.parse.unquote_to_bytes(token_uri[offset:end]))
+        offset = end
+    yield decoder.decode(b"", final=True)
+
+
+class _JSONStream:
+    """Minimal pull parser over a stream of JSON text chunks.
+
+    Only the current chunk (plus whatever value is being kept) is held in
+    memory; strings that are skipped or truncated are scanned with str.find
+    and dropped chunk by chunk.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self):
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at JSON offset {self.pos}, found '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def _backslashes_before(self, index):
+        count = 0
+        while index - count - 1 >= self.pos and self.buf[index - count - 1] == "\\":
+            count += 1
+        return count
+
+    def read_raw_string(self, keep=None):
+        """Consume a JSON string and return its raw (still escaped) contents.
+
+        At most `keep` raw characters are kept; the rest of the string is only
+        scanned. Returns (raw, complete) where complete tells whether `raw`
+        holds the whole string.
+        """
+        self.expect('"')
+        pieces = []
+        kept = 0
+        search = self.pos
+        while True:
+            end = self.buf.find('"', search)
+            if end != -1 and self._backslashes_before(end) % 2:
+                search = end + 1
+                continue
+            # Without a closing quote, hold back a trailing run of backslashes so
+            # the escaping of a quote at the start of the next chunk is judged correctly
+            cut = end if end != -1 else len(self.buf) - self._backslashes_before(len(self.buf))
+            if keep is None or kept < keep:
+                piece = self.buf[self.pos:cut] if keep is None else self.buf[self.pos:min(cut, self.pos + keep - kept)]
+                pieces.append(piece)
+                kept += len(piece)
+            if end != -1:
+                self.pos = end + 1
+                return "".join(pieces), keep is None or kept < keep
+            self.pos = cut
+            search = len(self.buf) - cut  # _fill drops everything before pos
+            if not self._fill():
+                raise ValueError("Unterminated JSON string")
+
+    def read_string(self):
+        raw, _ = self.read_raw_string()
+        return json.loads(f'"{raw}"')
+
+    def read_truncated_string(self, limit):
+        """Return (first `limit` characters, whether the string is longer) without keeping the rest."""
+        raw, complete = self.read_raw_string(keep=(limit + 1) * RAW_CHARS_PER_CHAR)
+        if complete:
+            text = json.loads(f'"{raw}"')
+            return text[:limit], len(text) > limit
+        # Drop a partial escape sequence at the cut before decoding
+        text = ""
+        for trim in range(RAW_CHARS_PER_CHAR):
+            try:
+                text = json.loads(f'"{raw[:len(raw) - trim]}"')
+                break
+            except json.JSONDecodeError:
+                continue
+        return text[:limit], True
+
+    def read_raw_value(self):
+        """Consume any JSON value and return its raw text."""
+        first = self.peek()
+        if first == '"':
+            raw, _ = self.read_raw_string()
+            return f'"{raw}"'
+        if first not in "[{":
+            while True:
+                match = _SCALAR_END.search(self.buf, self.pos)
+                if match or not self._fill():
+                    end = match.start() if match else len(self.buf)
+                    raw = self.buf[self.pos:end]
+                    self.pos = end
+                    return raw
+        pieces = []
+        depth = 0
+        while True:
+            match = _CONTAINER_CHARS.search(self.buf, self.pos)
+            if match is None:
+                pieces.append(self.buf[self.pos:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON data")
+                continue
+            char = match.group()
+            pieces.append(self.buf[self.pos:match.start()])
+            self.pos = match.start()
+            if char == '"':
+                raw, _ = self.read_raw_string()
+                pieces.append(f'"{raw}"')
+                continue
+            pieces.append(char)
+            self.pos += 1
+            depth += 1 if char in "[{" else -1
+            if depth == 0:
+                return "".join(pieces)
+
+    def skip_value(self):
+        if self.peek() == '"':
+            self.read_raw_string(keep=0)
+        else:
+            self.read_raw_value()
+
+
+def _truncate(stream, limit):
+    if stream.peek() == '"':
+        text, more = stream.read_truncated_string(limit)
+        return text + ("..." if more else "")
+    value = json.loads(stream.read_raw_value())
+    return value[:limit] + ("..." if len(value) > limit else "")
+
+
+def decode_metadata_stream(chunks):
+    """Extract name, truncated description/image and attributes from streamed metadata JSON.
+
+    Returns a dict with the keys that were present; other keys are skipped
+    without being decoded.
+    """
+    stream = _JSONStream(chunks)
+    fields = {}
+    stream.expect("{")
+    if stream.peek() == "}":
+        return fields
+    while True:
+        key = stream.read_string()
+        stream.expect(":")
+        if key == "description":
+            fields[key] = _truncate(stream, DESCRIPTION_LIMIT)
+        elif key == "image":
+            fields[key] = _truncate(stream, IMAGE_LIMIT)
+        elif key in ("name", "attributes"):
+            fields[key] = json.loads(stream.read_raw_value())
+        else:
+            stream.skip_value()
+        separator = stream.peek()
+        stream.pos += 1
+        if separator == "}":
+            return fields
+        if separator != ",":
+            raise ValueError(f"Expected ',' or '}}' in JSON object, found '{separator}'")
+
+
+def decode_token_uri_streaming(token_id, token_uri, chunk_size=CHUNK_SIZE):
+    """Streaming counterpart of get_token_metadata's decoding for an already fetched tokenURI.
+
+    Returns (token_id, result) with the same result layout as
+    get_token_metadata, but never materializes the full decoded JSON or the
+    embedded image.
+    """
+    try:
+        if token_uri.startswith(BASE64_PREFIX):
+            chunks = _base64_chunks(token_uri, len(BASE64_PREFIX), chunk_size)
+        elif token_uri.startswith(URL_ENCODED_PREFIX):
+            chunks = _url_encoded_chunks(token_uri, len(URL_ENCODED_PREFIX), chunk_size)
+        elif "<svg" in token_uri:
+            return token_id, {
+                "name": f"Token {token_id} (SVG)",
+                "type": "svg",
+                "data": token_uri[:200] + "..."
+            }
+        else:
+            return token_id, {
+                "error": "Unhandled format",
+                "preview": token_uri[:100] + "..."
+            }
+
+        fields = decode_metadata_stream(chunks)
+        result = {
+            "token_id": token_id,
+            "name": fields.get("name", f"Token {token_id}"),
+            "description": fields.get("description", ""),
+            "image": fields.get("image", ""),
+            "attributes": {}
+        }
+        for attr in fields.get("attributes", []):
+            trait_type = attr.get("trait_type", "unknown")
+            result["attributes"][trait_type] = attr.get("value")
+        return token_id, result
+
+    except Exception as e:
+        print(f"\nError processing token {token_id}: {str(e)}")
+        return token_id, {"token_id": token_id, "error": str(e)}
@@ -3,18 +3,7 @@ from dotenv import load_dotenv
 from web3 import Web3
 import json
 import base64
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Get Infura Project ID from environment variables
-infura_project_id = os.getenv('INFURA_PROJECT_ID')
-if not infura_project_id:
-    raise ValueError("INFURA_PROJECT_ID environment variable is not set")
-
-# Connect to Ethereum mainnet using Infura
-infura_url = f'https://mainnet.infura.io/v3/{infura_project_id}'
-w3 = Web3(Web3.HTTPProvider(infura_url))
+from rpc_cache import provider_from_env, pinned_block_from_env
 
 # Contract address and ABI
 # Using Web3 to ensure proper checksum address
@@ -22,15 +11,26 @@ contract_address = Web3.to_checksum_address('0x5726c14663a1ead4a7d320e8a653c9710
 # Minimal ABI for tokenURI function
 abi = '''[{"inputs":[{"internalType":"uint256","name":"tokenId","type":"uint256"}],"name":"tokenURI","outputs":[{"internalType":"string","name":"","type":"string"}],"stateMutability":"view","type":"function"}]'''
 
-# Create contract instance
-contract = w3.eth.contract(address=contract_address, abi=abi)
+def connect(rpc_url=None):
+    """Return (contract, block_identifier) on `rpc_url`, by default Infura, through the RPC cache if one is configured."""
+    if rpc_url is None:
+        # Load environment variables from .env file
+        load_dotenv()
+        # Get Infura Project ID from environment variables; not needed when replaying a recorded
+        # RPC cache (RPC_CACHE_MODE=replay with PINNED_BLOCK set to the recorded block)
+        infura_project_id = os.getenv('INFURA_PROJECT_ID')
+        if not infura_project_id and os.getenv('RPC_CACHE_MODE') != 'replay':
+            raise ValueError("INFURA_PROJECT_ID environment variable is not set")
+        rpc_url = f'https://mainnet.infura.io/v3/{infura_project_id}' if infura_project_id else None
+    w3 = Web3(provider_from_env(rpc_url))
+    return w3.eth.contract(address=contract_address, abi=abi), pinned_block_from_env()
 
 import urllib.parse
 
-def get_token_uri(token_id):
+def get_token_uri(token_id, contract, block_identifier="latest"):
     try:
         print(f"\n--- Fetching tokenURI for token ID: {token_id} ---")
-        token_uri = contract.functions.tokenURI(token_id).call()
+        token_uri = contract.functions.tokenURI(token_id).call(block_identifier=block_identifier)
         print(f"Raw tokenURI: {token_uri[:200]}...")
         
         if token_uri.startswith("data:application/json;base64,"):
@@ -82,10 +82,11 @@ def print_token_metadata(token_id, metadata):
 if __name__ == "__main__":
     # Test with multiple token IDs
     test_token_ids = [1, 2, 3, 10, 100]
+    contract, block_identifier = connect()
     
     for token_id in test_token_ids:
         try:
-            metadata = get_token_uri(token_id)
+            metadata = get_token_uri(token_id, contract, block_identifier)
             print_token_metadata(token_id, metadata)
             print("\n" + "="*50 + "\n")  # Separator between tokens
         except Exception as e:
@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from event_logs import event_topic
+from get_buterin_token_uris.client import load_abi, CONTRACT_ADDRESS
+from standin_node import StandInNode
+
+MINED = event_topic(load_abi(), "Mined")
+TRANSFER = event_topic(load_abi(), "Transfer")
+
+
+def _hash(*parts):
+    return "0x" + hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _topic(value):
+    return "0x" + format(value, "064x")
+
+
+class Chain:
+    """In-memory chain of blocks carrying Mined/Transfer events, with reorgs.
+
+    Events are ("mint", token_id, quote_title) or ("transfer", token_id).
+    tokenURI calls, plain or through Multicall3 aggregate3, are answered by
+    a StandInNode with metadata carrying the quote title the token was
+    minted with as of the requested block, and revert for tokens not minted
+    yet. Set `failing` to make every
+    eth_call fail like an overloaded node, and `throttle` to answer that
+    many of the next HTTP requests with 429 Too Many Requests.
+    """
+
+    def __init__(self, height=100):
+        self.blocks = [{"hash": _hash(number, "genesis"), "events": []} for number in range(height + 1)]
+        self.salt = itertools.count()
+        self.failing = False
+        self.throttle = 0
+        self.lock = threading.Lock()
+        self.node = StandInNode(self.token_uri)
+
+    @property
+    def head(self):
+        return len(self.blocks) - 1
+
+    def mine(self, *events):
+        with self.lock:
+            self.blocks.append({"hash": _hash(len(self.blocks), next(self.salt)), "events": list(events)})
+
+    def reorg(self, depth, *replacement):
+        """Drop the last `depth` blocks, then mine one block per events list in `replacement`."""
+        with self.lock:
+            del self.blocks[len(self.blocks) - depth:]
+        for events in replacement:
+            self.mine(*events)
+
+    def quotes(self, block=None):
+        """Return {token_id: quote_title} as of `block` (default: the head)."""
+        block = self.head if block is None else block
+        quotes = {}
+        for entry in self.blocks[:block + 1]:
+            for event in entry["events"]:
+                if event[0] == "mint":
+                    quotes[event[1]] = event[2]
+        return quotes
+
+    def token_uri(self, token_id, block):
+        quote = self.quotes(block).get(token_id)
+        if quote is None:
+            return None
+        metadata = {"name": f"Card {token_id}", "description": "", "image": "",
+                    "attributes": [{"trait_type": "Quote Title", "value": quote}]}
+        return "data:application/json;base64," + base64.b64encode(json.dumps(metadata).encode()).decode()
+
+    def logs(self, from_block, to_block):
+        logs = []
+        for number in range(from_block, min(to_block, self.head) + 1):
+            entry = self.blocks[number]
+            for index, event in enumerate(entry["events"]):
+                logs.append({
+                    "address": CONTRACT_ADDRESS,
+                    "topics": [MINED if event[0] == "mint" else TRANSFER, _topic(1), _topic(2), _topic(event[1])],
+                    "data": "0x",
+                    "blockNumber": hex(number),
+                    "blockHash": entry["hash"],
+                    "logIndex": hex(index),
+                    "transactionIndex": "0x0",
+                    "transactionHash": _hash(entry["hash"], index),
+                    "removed": False,
+                })
+        return logs
+
+    def handle(self, method, params):
+        """Return the result of one JSON-RPC request; raises ValueError for a revert."""
+        if method == "eth_chainId":
+            return "0x1"
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBlockByNumber":
+            number = self.head if params[0] == "latest" else int(params[0], 16)
+            if number > self.head:
+                return None
+            return {"number": hex(number), "hash": self.blocks[number]["hash"],
+                    "parentHash": self.blocks[number - 1]["hash"] if number else "0x" + "00" * 32,
+                    "timestamp": hex(number * 12), "transactions": []}
+        if method == "eth_getLogs":
+            log_filter = params[0]
+            return self.logs(int(log_filter["fromBlock"], 16), int(log_filter["toBlock"], 16))
+        if method == "eth_call":
+            if self.failing:
+                raise RuntimeError("upstream overloaded")
+            response = self.node.make_request(method, params)
+            if "error" in response:
+                raise ValueError(response["error"]["message"])
+            return response["result"]
+        raise NotImplementedError(method)
+
+
+def serve(chain):
+    """Serve `chain` over JSON-RPC on a free local port. Returns (server, url); call server.shutdown() when done."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _answer(self, request):
+            try:
+                result = chain.handle(request["method"], request["params"])
+            except ValueError as e:
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": 3, "message": str(e), "data": "0x"}}
+            except RuntimeError as e:
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32603, "message": str(e)}}
+            return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with chain.lock:
+                throttled, chain.throttle = chain.throttle > 0, max(0, chain.throttle - 1)
+            if throttled:
+                self.send_response(429)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            response = [self._answer(request) for request in body] if isinstance(body, list) else self._answer(body)
+            payload = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,52 @@
+import pytest
+
+from async_scraper import is_rate_limit_error, ConcurrentFetcher, TokenBucket
+from devchain import Chain, serve
+from get_buterin_token_uris.client import load_abi, CONTRACT_ADDRESS
+
+
+class HTTPError(Exception):
+    status = 429
+
+
+def test_rate_limit_errors():
+    assert is_rate_limit_error(HTTPError("Too Many Requests"))
+    assert is_rate_limit_error({"code": -32005, "message": "limit exceeded"})
+    assert is_rate_limit_error(ValueError("429 Client Error: Too Many Requests"))
+    assert not is_rate_limit_error(ValueError("execution reverted"))
+
+
+def test_token_bucket_backs_off_and_recovers():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0.5)
+    bucket = TokenBucket(rate=8.0, min_rate=1.0, max_rate=10.0)
+    bucket.on_throttled()
+    assert bucket.rate == 4.0 and bucket.tokens == 0.0
+    for _ in range(3):
+        bucket.on_throttled()
+    assert bucket.rate == 1.0
+    for _ in range(1000):
+        bucket.on_success()
+    assert bucket.rate == 10.0
+
+
+def test_fetcher_retries_throttled_requests():
+    chain = Chain(10)
+    chain.blocks[5]["events"] = [("mint", token_id, f"Quote {token_id}") for token_id in range(6)]
+    server, url = serve(chain)
+    chain.throttle = 3
+    fetcher = ConcurrentFetcher(url, CONTRACT_ADDRESS, load_abi(), concurrency=4, rate=20.0)
+    try:
+        token_uris, errors, stats = fetcher.fetch(range(8))
+    finally:
+        fetcher.close()
+        server.shutdown()
+        server.server_close()
+    assert sorted(token_uris) == list(range(6))
+    assert sorted(errors) == [6, 7]  # not minted: reverted, not retried
+    assert stats["throttled"] == stats["retries"] == 3
+    assert stats["requests"] == 11
+    assert fetcher.bucket.rate < 20.0
+    # Counted on the wire: every response carries its tokenURI hex-encoded
+    assert fetcher.totals["request_bytes"] > 0
+    assert fetcher.totals["response_bytes"] > 2 * sum(len(token_uri) for token_uri in token_uris.values())
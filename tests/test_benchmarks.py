@@ -0,0 +1,22 @@
+import os
+
+from benchmark_decode import load_fixtures
+from benchmarks import BENCHMARKS, benchmark, run_benchmarks
+
+FIXTURES = load_fixtures(os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "token_uris"))
+
+
+def test_every_benchmark_runs():
+    report = run_benchmarks(FIXTURES, list(BENCHMARKS), rounds=1)
+    assert {name: stats.get("error") for name, stats in report.items()} == dict.fromkeys(BENCHMARKS)
+
+
+def test_failing_benchmark_is_reported(monkeypatch):
+    monkeypatch.setitem(BENCHMARKS, "broken", None)
+
+    @benchmark("broken")
+    def bench_broken(fixtures, results, tmp):
+        raise RuntimeError("setup failed")
+
+    report = run_benchmarks(FIXTURES, ["broken"], rounds=1)
+    assert report == {"broken": {"error": "RuntimeError: setup failed"}}
@@ -0,0 +1,51 @@
+import pytest
+from web3 import Web3
+
+from multicall import fetch_token_uris
+from standin_node import StandInNode
+
+CONTRACT_ADDRESS = "0x5726C14663A1EaD4A7D320E8A653c9710b2A2E89"
+TOKEN_URI_ABI = [{"inputs": [{"name": "tokenId", "type": "uint256"}], "name": "tokenURI",
+                  "outputs": [{"name": "", "type": "string"}], "stateMutability": "view", "type": "function"}]
+
+
+def stand_in(**options):
+    return StandInNode(lambda token_id, block: f"data:application/json;base64,token-{token_id}", **options)
+
+
+def _contract(node):
+    w3 = Web3(node)
+    return w3, w3.eth.contract(address=CONTRACT_ADDRESS, abi=TOKEN_URI_ABI)
+
+
+def test_reverting_sub_call_falls_back_to_a_single_call():
+    node = stand_in(reverting={3}, fail_in_multicall={5})
+    w3, contract = _contract(node)
+
+    token_uris, errors = fetch_token_uris(w3, contract, range(8), block_identifier=1)
+
+    assert node.aggregate3_sizes == [8]
+    assert sorted(node.single_calls) == [3, 5]
+    assert token_uris[5] == "data:application/json;base64,token-5"
+    assert list(errors) == [3] and "revert" in errors[3]
+    assert sorted(token_uris) == [0, 1, 2, 4, 5, 6, 7]
+
+
+def test_rejected_batch_is_split():
+    node = stand_in(max_batch=3)
+    w3, contract = _contract(node)
+
+    token_uris, errors = fetch_token_uris(w3, contract, range(8), batch_size=8, block_identifier=1)
+
+    assert not errors
+    assert token_uris == {token_id: f"data:application/json;base64,token-{token_id}" for token_id in range(8)}
+    assert node.aggregate3_sizes == [8, 4, 2, 2, 4, 2, 2]
+    assert not node.single_calls
+
+
+def test_transport_errors_are_raised_without_splitting():
+    node = stand_in(down=True)
+    w3, contract = _contract(node)
+
+    with pytest.raises(ConnectionError):
+        fetch_token_uris(w3, contract, range(8), block_identifier=1)
@@ -0,0 +1,73 @@
+import base64
+import json
+
+import pytest
+
+from pipeline import run_pipeline
+from result_store import ResultStore
+
+
+def token_uri(token_id):
+    metadata = {"name": f"Card {token_id}", "attributes": [{"trait_type": "Quote Title", "value": f"Quote {token_id % 3}"}]}
+    return "data:application/json;base64," + base64.b64encode(json.dumps(metadata).encode()).decode()
+
+
+def fake_fetch(reverting=(), transient=(), missing=(), raise_on=None, unpicklable=()):
+    """fetch_batch stand-in: reverts, transient errors, silently missing tokens and failing batches."""
+    def fetch_batch(token_ids):
+        if raise_on in token_ids:
+            raise ConnectionError("Connection refused")
+        token_uris, errors = {}, {}
+        for token_id in token_ids:
+            if token_id in reverting:
+                errors[token_id] = "execution reverted"
+            elif token_id in transient:
+                errors[token_id] = "429 Too Many Requests"
+            elif token_id in unpicklable:
+                token_uris[token_id] = lambda: None  # can't be sent to a decode worker
+            elif token_id not in missing:
+                token_uris[token_id] = token_uri(token_id)
+        return token_uris, errors
+    return fetch_batch
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultStore(str(tmp_path / "results.db")) as store:
+        yield store
+
+
+def test_results_and_errors_are_stored(store):
+    run_pipeline(range(30), fake_fetch(reverting={4}, missing={7}), store, workers=2, fetch_batch_size=8,
+                 decode_batch_size=3)
+
+    assert len(store) == 30
+    assert store.get(5)["attributes"] == {"Quote Title": "Quote 2"}
+    assert store.get(4) == {"token_id": 4, "error": "execution reverted"}
+    assert store.get(7) == {"token_id": 7, "error": "tokenURI not fetched"}
+
+
+def test_keep_previous_leaves_stored_results(store):
+    previous = {"token_id": 3, "name": "Card 3", "attributes": {"Quote Title": "Old"}}
+    store.put({3: previous})
+
+    run_pipeline(range(10), fake_fetch(transient={3}, reverting={6}), store, workers=2,
+                 keep_previous=lambda token_id, error: error.startswith("429"))
+
+    assert store.get(3) == previous
+    assert "error" in store.get(6)
+
+
+def test_fetch_failure_is_raised_after_the_writer_drains(store):
+    with pytest.raises(ConnectionError):
+        run_pipeline(range(40), fake_fetch(raise_on=25), store, workers=2, fetch_batch_size=10)
+    # The batches fetched before the failure are still written
+    assert store.token_ids() == set(range(20))
+
+
+def test_decode_failure_is_raised_after_the_writer_drains(store):
+    with pytest.raises(AttributeError, match="pickle"):
+        run_pipeline(range(40), fake_fetch(unpicklable={12}), store, workers=2, fetch_batch_size=10,
+                     decode_batch_size=5)
+    # Decoded batches are collected in order, so everything before the failing one is written
+    assert store.token_ids() == set(range(10))
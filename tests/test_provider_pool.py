@@ -0,0 +1,141 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from web3 import Web3
+
+from image_extractor import fetch_code
+from profiler import Profiler
+from provider_pool import NoHealthyEndpoint, PooledHTTPProvider, RequestRejected, REQUEST_DEADLINE
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.send_header("Content-Type", "text/plain")
+            self.end_headers()
+            self.wfile.write(b"nope")
+            return
+        if isinstance(body, list):
+            # Batch responses may come back in any order
+            result = [{"jsonrpc": "2.0", "id": item["id"], "result": item["params"][0]} for item in reversed(body)]
+            if self.server.drop_batch_item:
+                # A provider that loses one item and reports it as an error without an id
+                result = result[1:] + [{"jsonrpc": "2.0", "id": None, "error": {"code": -32603, "message": "lost"}}]
+        else:
+            result = {"jsonrpc": "2.0", "id": body["id"], "result": "0x10"}
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(status=200):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.requests, server.status, server.drop_batch_item = 0, status, False
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def test_fails_fast_when_every_endpoint_is_down():
+    pool = PooledHTTPProvider([dead_url()])
+    elapsed = []
+    for _ in range(4):
+        started = time.monotonic()
+        with pytest.raises(NoHealthyEndpoint):
+            pool.make_request("eth_blockNumber", [])
+        elapsed.append(time.monotonic() - started)
+    assert max(elapsed) < REQUEST_DEADLINE + 1
+    # Once the cooldown outlasts the deadline, requests fail without waiting
+    assert elapsed[-1] < 0.5
+
+
+def test_identical_endpoints_share_traffic(serve):
+    (first, first_url), (second, second_url) = serve(), serve()
+    pool = PooledHTTPProvider([first_url, second_url])
+    for _ in range(200):
+        assert pool.make_request("eth_blockNumber", [])["result"] == "0x10"
+    assert min(first.requests, second.requests) >= 50
+
+
+def test_stale_latency_is_probed(serve):
+    (first, first_url), (second, second_url) = serve(), serve()
+    pool = PooledHTTPProvider([first_url, second_url])
+    for _ in range(2):
+        pool.make_request("eth_blockNumber", [])
+    pool.endpoints[0].latency = 10.0  # a stale estimate must not starve the endpoint
+    first.requests = 0
+    for _ in range(400):
+        pool.make_request("eth_blockNumber", [])
+    assert first.requests > 0
+    assert pool.endpoints[0].latency < 10.0
+
+
+def test_client_errors_do_not_cool_endpoints_down(serve):
+    server, url = serve(status=400)
+    pool = PooledHTTPProvider([url])
+    with pytest.raises(RequestRejected):
+        pool.make_request("eth_blockNumber", [])
+    assert server.requests == 1
+    assert pool.endpoints[0].is_healthy(time.monotonic())
+
+
+def test_batches_are_encoded_and_reordered(serve):
+    server, url = serve()
+    w3 = Web3(PooledHTTPProvider([url]))
+    addresses = [f"0x{index:040x}" for index in range(1, 6)]
+    assert fetch_code(w3, addresses) == {address: bytes.fromhex(address[2:]) for address in addresses}
+    assert server.requests == 1
+
+
+
+def test_incomplete_batches_fall_back_to_single_calls(serve):
+    server, url = serve()
+    server.drop_batch_item = True
+    pool = PooledHTTPProvider([url])
+    error = pool.make_batch_request([("eth_getCode", ["0x01", "latest"]), ("eth_getCode", ["0x02", "latest"])])
+    assert "missing 1 of 2" in error["error"]["message"]
+
+    # Single eth_getCode calls answer 0x10; no address may get another one's code from the batch
+    addresses = [f"0x{index:040x}" for index in range(1, 6)]
+    assert fetch_code(Web3(pool), addresses) == dict.fromkeys(addresses, b"\x10")
+
+
+def test_profiler_counts_requests_on_the_wire(serve):
+    server, url = serve()
+    pool = PooledHTTPProvider([url])
+    pool.profiler = Profiler(enabled=True)
+    for _ in range(3):
+        pool.make_request("eth_chainId", [])  # answered from memory after the first
+        pool.make_request("eth_blockNumber", [])
+    pool.make_batch_request([("eth_getCode", ["0x01", "latest"])] * 2)
+    counts = {method: entry["requests"] for method, entry in pool.profiler.report()["rpc"].items()}
+    assert counts == {"eth_chainId": 1, "eth_blockNumber": 3, "batch:eth_getCode": 1}
+    assert server.requests == 5
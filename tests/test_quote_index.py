@@ -0,0 +1,18 @@
+from quote_index import TraitIndex
+
+
+def _results(count):
+    return {token_id: {"attributes": {"Quote Title": f"Quote {token_id % 5}", "Icons": token_id % 3}}
+            for token_id in range(count)}
+
+
+def test_rebuilding_leaves_mapped_readers_intact(tmp_path):
+    path = str(tmp_path / "trait_index.bin")
+    TraitIndex.build(_results(2000).items()).save(path)
+    reader = TraitIndex.load(path)
+
+    # A smaller rebuild used to truncate the mapped file in place, and the next lookup died with SIGBUS
+    TraitIndex.build(_results(10).items()).save(path)
+
+    assert list(reader.lookup("Quote Title", "Quote 1")) == list(range(1, 2000, 5))
+    assert list(TraitIndex.load(path).query(**{"Quote Title": "Quote 1", "Icons": 1})) == [1]
@@ -0,0 +1,49 @@
+from web3.providers import JSONBaseProvider
+
+from rpc_cache import CachingProvider
+
+CALL = {"to": "0x5726c14663a1ead4a7d320e8a653c9710b2a2e89", "data": "0xc87b56dd"}
+REVERT = {"code": 3, "message": "execution reverted", "data": "0x"}
+
+
+class Node(JSONBaseProvider):
+    """Answers eth_call with a result, or a revert for calls whose data ends in "03"; fails on anything else."""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    def make_request(self, method, params):
+        self.requests += 1
+        if method != "eth_call":
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32603, "message": "internal error"}}
+        if params[0]["data"].endswith("03"):
+            return {"jsonrpc": "2.0", "id": 0, "error": REVERT}
+        return {"jsonrpc": "2.0", "id": 0, "result": "0x01"}
+
+
+def test_reverts_are_recorded_and_replayed(tmp_path):
+    node = Node()
+    recorder = CachingProvider(node, mode="record", cache_dir=str(tmp_path))
+    reverting = [dict(CALL, data=CALL["data"] + "03"), "0x1"]
+    succeeding = [dict(CALL, data=CALL["data"] + "01"), "0x1"]
+
+    assert recorder.make_request("eth_call", reverting)["error"] == REVERT
+    assert recorder.make_request("eth_call", succeeding)["result"] == "0x01"
+    assert recorder.make_request("eth_call", reverting)["error"] == REVERT
+    assert node.requests == 2
+
+    replayer = CachingProvider(mode="replay", cache_dir=str(tmp_path))
+    assert replayer.make_request("eth_call", reverting)["error"] == REVERT
+    assert replayer.make_batch_request([("eth_call", succeeding), ("eth_call", reverting)]) == [
+        {"jsonrpc": "2.0", "id": 0, "result": "0x01"}, {"jsonrpc": "2.0", "id": 0, "error": REVERT}]
+
+
+def test_other_errors_are_not_recorded(tmp_path):
+    node = Node()
+    recorder = CachingProvider(node, mode="record", cache_dir=str(tmp_path))
+    params = [{"address": CALL["to"], "fromBlock": "0x1", "toBlock": "0x1"}]
+
+    recorder.make_request("eth_getLogs", params)
+    recorder.make_request("eth_getLogs", params)
+    assert node.requests == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from result_store import ResultStore
+from scheduler import run_worker, WorkScheduler, FAILED
+
+
+class Unprintable:
+    def __str__(self):
+        raise RuntimeError("cannot format error")
+
+
+def test_failed_transaction_releases_the_write_lock(tmp_path):
+    path = str(tmp_path / "work.db")
+    with WorkScheduler(path) as first, WorkScheduler(path) as second:
+        first.plan(0, 9, shard_size=5)
+        second.conn.execute("PRAGMA busy_timeout = 100")
+
+        with pytest.raises(RuntimeError):
+            first.mark_failed({3: "timeout", 4: Unprintable()})
+
+        # The first connection must not still hold the write lock, and its partial update is rolled back
+        second.mark_done([1])
+        assert second.status() == {"pending": 9, "done": 1}
+        assert first.conn.execute("SELECT state FROM work WHERE token_id = 3").fetchone()[0] != FAILED
+
+
+def test_mark_failed_skips_unknown_tokens(tmp_path):
+    with WorkScheduler(str(tmp_path / "work.db")) as scheduler:
+        scheduler.plan(0, 4)
+        scheduler.mark_failed({3: "timeout", 99: "not queued"})
+        assert scheduler.status() == {"pending": 4, "failed": 1}
+
+
+def test_fetch_errors_feed_the_retry_queue(tmp_path):
+    path = str(tmp_path / "work.db")
+
+    def fetch_batch(token_ids):
+        raise ConnectionError("Connection refused")
+
+    with WorkScheduler(path) as scheduler, ResultStore(path) as store:
+        scheduler.plan(0, 9, shard_size=5)
+        assert run_worker(scheduler, store, fetch_batch, None, "worker") == 10
+        rows = scheduler.conn.execute("SELECT state, attempts, next_attempt, last_error FROM work").fetchall()
+        assert {row[0] for row in rows} == {FAILED}
+        assert all(attempts == 1 and next_attempt is not None for _, attempts, next_attempt, _ in rows)
+        assert {row[3] for row in rows} == {"Connection refused"}
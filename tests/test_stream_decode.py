@@ -0,0 +1,56 @@
+import base64
+import contextlib
+import io
+import json
+import os
+import random
+import urllib.parse
+
+import pytest
+
+from benchmark_decode import load_fixtures
+from get_buterin_token_uris.decode import get_token_metadata
+from stream_decode import decode_token_uri_streaming, BASE64_PREFIX, URL_ENCODED_PREFIX
+
+FIXTURES = load_fixtures(os.path.join(os.path.dirname(__file__), os.pardir, "fixtures", "token_uris"))
+# Backslash runs, quotes, control characters, percent signs and multi-byte UTF-8
+ALPHABET = ["a", "b", " ", ",", "{", "]", "\\", "\\", '"', "\n", "\t", "%", "%2", "é", "日", "🦄", " "]
+
+
+def reference(token_id, token_uri):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return get_token_metadata(token_id, token_uri=token_uri)
+
+
+def random_token_uri(rng, token_id):
+    def text(length):
+        return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+    metadata = {"name": text(rng.randrange(20)), "description": text(rng.randrange(180, 230)),
+                "image": "data:image/jpeg;base64," + text(rng.randrange(90, 120)),
+                "attributes": [{"trait_type": "Quote Title", "value": text(rng.randrange(30))},
+                               {"trait_type": text(5), "value": rng.choice([1, 2.5, None, True, [1, {"x": "]"}]])}]}
+    text_json = json.dumps(metadata, ensure_ascii=rng.random() < 0.5)
+    if rng.random() < 0.5:
+        return BASE64_PREFIX + base64.b64encode(text_json.encode()).decode()
+    return URL_ENCODED_PREFIX + urllib.parse.quote(text_json, safe=rng.choice(["", " ,:{}[]", "\\"]))
+
+
+def test_fixtures_are_committed():
+    assert len(FIXTURES) >= 5
+    assert {token_uri.split(",")[0] + "," for token_uri in FIXTURES.values()} == {BASE64_PREFIX, URL_ENCODED_PREFIX}
+
+
+@pytest.mark.parametrize("chunk_size", [4, 5, 13, 64 * 1024])
+def test_fixtures_match_reference_decoder(chunk_size):
+    for token_id, token_uri in FIXTURES.items():
+        assert decode_token_uri_streaming(token_id, token_uri, chunk_size=chunk_size) == reference(token_id, token_uri)
+
+
+def test_random_token_uris_match_reference_decoder():
+    rng = random.Random(6)
+    for token_id in range(500):
+        token_uri = random_token_uri(rng, token_id)
+        expected = reference(token_id, token_uri)
+        for chunk_size in (4, 5, 13):
+            assert decode_token_uri_streaming(token_id, token_uri, chunk_size=chunk_size) == expected, token_uri
@@ -0,0 +1,25 @@
+import test_token_uri
+from devchain import Chain, serve
+
+
+def test_replays_a_recorded_cache_offline(tmp_path, monkeypatch):
+    chain = Chain(20)
+    chain.blocks[10]["events"] = [("mint", 1, "Proof of Stake"), ("mint", 2, "Soulbound")]
+    server, url = serve(chain)
+    monkeypatch.delenv("INFURA_PROJECT_ID", raising=False)
+    monkeypatch.setenv("RPC_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("PINNED_BLOCK", "15")
+    monkeypatch.setenv("RPC_CACHE_MODE", "record")
+    try:
+        contract, block = test_token_uri.connect(url)
+        recorded = {token_id: test_token_uri.get_token_uri(token_id, contract, block) for token_id in (1, 2, 3)}
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert recorded[1]["attributes"] == [{"trait_type": "Quote Title", "value": "Proof of Stake"}]
+    assert recorded[3] is None  # not minted: the call reverts
+
+    # No node and no INFURA_PROJECT_ID: everything comes from the cache, reverts included
+    monkeypatch.setenv("RPC_CACHE_MODE", "replay")
+    contract, block = test_token_uri.connect()
+    assert {token_id: test_token_uri.get_token_uri(token_id, contract, block) for token_id in (1, 2, 3)} == recorded
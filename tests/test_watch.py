@@ -0,0 +1,130 @@
+import csv
+import json
+import os
+
+import pytest
+from web3 import Web3
+
+from devchain import Chain, serve
+from get_buterin_token_uris.client import load_abi, CONTRACT_ADDRESS
+from profiler import Profiler
+from provider_pool import PooledHTTPProvider
+from result_store import ResultStore
+from stream_decode import decode_token_uri_streaming
+from watch import Watcher
+
+
+@pytest.fixture
+def chain():
+    chain = Chain(100)
+    chain.blocks[50]["events"] = [("mint", token_id, f"Quote {token_id % 3}") for token_id in range(5)]
+    server, chain.url = serve(chain)
+    yield chain
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_watcher(chain, tmp_path):
+    w3 = Web3(PooledHTTPProvider([chain.url]))
+    contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=load_abi())
+    stores = []
+
+    def make():
+        store = ResultStore(str(tmp_path / "results.db"))
+        stores.append(store)
+        return Watcher(w3, contract, store, decode_token_uri_streaming, mapping_path=str(tmp_path / "mapping.json"),
+                       csv_path=str(tmp_path / "mapping.csv"), reorg_depth=4)
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def assert_exports_match(watcher, chain):
+    expected = {}
+    for token_id, quote in sorted(chain.quotes().items()):
+        expected.setdefault(quote, []).append(token_id)
+    with open(watcher.mapping_path) as f:
+        assert json.load(f) == expected
+    with open(watcher.csv_path, newline="") as f:
+        assert list(csv.reader(f))[1:] == [[quote, str(token_id)] for token_id, quote in sorted(chain.quotes().items())]
+    assert watcher.store.quote_mapping() == expected
+
+
+def test_follows_new_blocks(chain, make_watcher):
+    watcher = make_watcher()
+    watcher.last_block = 0
+    assert watcher.poll() == 5
+    assert_exports_match(watcher, chain)
+    assert watcher.poll() == 0
+
+    chain.mine(("mint", 5, "Quote 9"))
+    chain.mine()
+    chain.mine(("transfer", 2))
+    assert watcher.poll() == 2
+    assert_exports_match(watcher, chain)
+
+    # A transfer refetches the token but leaves the quote, and so the exports, alone
+    modified = os.stat(watcher.csv_path).st_mtime_ns
+    chain.mine(("transfer", 1))
+    assert watcher.poll() == 1
+    assert os.stat(watcher.csv_path).st_mtime_ns == modified
+
+
+def test_idle_poll_cost(chain, make_watcher):
+    watcher = make_watcher()
+    watcher.last_block = 0
+    watcher.poll()
+    profiler = watcher.w3.provider.profiler = Profiler(enabled=True)
+    watcher.poll()
+    # eth_blockNumber for the head, eth_getBlockByNumber to check the newest recorded block for a reorg
+    assert {method: entry["requests"] for method, entry in profiler.rpc.items()} == {
+        "eth_blockNumber": 1, "eth_getBlockByNumber": 1}
+
+
+def test_reorg_refetches_orphaned_tokens(chain, make_watcher):
+    watcher = make_watcher()
+    watcher.last_block = 0
+    watcher.poll()
+    chain.mine(("mint", 6, "Quote 6"))
+    chain.mine()
+    watcher.poll()
+    assert watcher.store.get(6) is not None
+
+    chain.reorg(2, [("mint", 7, "Quote 7")], [], [])
+    watcher.poll()
+    assert_exports_match(watcher, chain)
+    assert "error" in watcher.store.get(6)  # no longer minted: tokenURI reverts
+    assert [number for number, _, _ in watcher.blocks] == list(range(chain.head - 3, chain.head + 1))
+
+
+def test_transient_failure_keeps_previous_result(chain, make_watcher):
+    watcher = make_watcher()
+    watcher.last_block = 0
+    watcher.poll()
+    previous = watcher.store.get(3)
+
+    chain.failing = True
+    chain.mine(("transfer", 3))
+    watcher.poll()
+    assert watcher.store.get(3) == previous
+    assert watcher.store.get_meta("refresh_pending") == [3]
+
+    chain.failing = False
+    assert watcher.poll() == 1
+    assert watcher.pending == set()
+    assert_exports_match(watcher, chain)
+
+
+def test_resumes_after_restart(chain, make_watcher):
+    watcher = make_watcher()
+    watcher.last_block = 0
+    watcher.poll()
+    watcher.store.close()
+
+    chain.mine(("mint", 9, "Quote 1"))
+    watcher = make_watcher()
+    assert watcher.last_block == chain.head - 1
+    assert watcher.poll() == 1
+    assert_exports_match(watcher, chain)
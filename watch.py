@@ -0,0 +1,202 @@
+import argparse
+import time
+
+from web3.exceptions import BlockNotFound
+
+from event_logs import event_topic, get_logs_chunked, log_token_id, SYNC_CONFIRMATIONS
+from exporter import export, QUOTE_MAPPING_CSV
+from multicall import fetch_token_uris, is_revert_error
+from result_store import result_quote_title, write_json_atomic, QUOTE_MAPPING_JSON
+
+POLL_INTERVAL = 2.0  # seconds between polls for a new head; mainnet blocks come every 12s
+REORG_DEPTH = SYNC_CONFIRMATIONS  # recent blocks whose hashes are kept to detect and roll back reorgs
+
+
+def _hex(value):
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+class Watcher:
+    """Follows the chain head and applies each new block's Mined/Transfer logs to the result store.
+
+    Only tokens named in new logs are refetched. An idle poll costs two
+    calls: eth_blockNumber, and eth_getBlockByNumber to check that the
+    newest recorded block is still on the chain. A poll that finds new
+    blocks adds one eth_getBlockByNumber per new block in the reorg window,
+    the eth_getLogs calls and the refetches of the tokens they name.
+
+    The quote mapping JSON and CSV are rewritten only when a quote changed,
+    but each rewrite covers the whole collection, not just the new events:
+    both are sorted files replaced atomically. The collection is capped at
+    2,015 tokens, so a rewrite takes about 5 ms, far below the 12s block
+    time.
+
+    The hashes of the last `reorg_depth` processed blocks are kept in the
+    store's meta table along with the tokens each block touched. When one
+    of them is no longer on the chain, the watcher rolls back to the last
+    block still there and refetches every token touched since.
+    """
+
+    def __init__(self, w3, contract, store, decode, mapping_path=QUOTE_MAPPING_JSON, csv_path=QUOTE_MAPPING_CSV,
+                 reorg_depth=REORG_DEPTH, confirmations=0):
+        self.w3 = w3
+        self.contract = contract
+        self.store = store
+        self.decode = decode
+        self.mapping_path = mapping_path
+        self.csv_path = csv_path
+        self.reorg_depth = reorg_depth
+        self.confirmations = confirmations
+        self.topics = [[event_topic(contract.abi, "Mined"), event_topic(contract.abi, "Transfer")]]
+        self.last_block = store.get_meta("last_block")
+        self.blocks = store.get_meta("watch_blocks", [])  # [[number, hash, [token IDs]], ...], oldest first
+        self.pending = set(store.get_meta("refresh_pending", []))  # tokens to refetch whatever the new logs say
+        self.titles = store.token_quotes()
+
+    def _block_hash(self, number):
+        try:
+            return _hex(self.w3.eth.get_block(number)["hash"])
+        except BlockNotFound:
+            return None  # the chain got shorter
+
+    def rollback(self):
+        """Drop recorded blocks that are no longer on the chain and queue the tokens they touched.
+
+        If none of the recorded blocks is left, the whole window of
+        `reorg_depth` blocks is rolled back.
+        """
+        if not self.blocks or self._block_hash(self.blocks[-1][0]) == self.blocks[-1][1]:
+            return
+        orphaned = set()
+        while self.blocks and self._block_hash(self.blocks[-1][0]) != self.blocks[-1][1]:
+            number, _, token_ids = self.blocks.pop()
+            orphaned.update(token_ids)
+            self.last_block = number - 1
+        self.pending |= orphaned
+        print(f"Reorg: rolled back to block {self.last_block}, refetching {len(orphaned)} tokens")
+        if not self.blocks:
+            print(f"Warning: the reorg may be deeper than the {self.reorg_depth} recorded blocks; rerun the "
+                  f"incremental scrape from an earlier block to repair tokens touched before block {self.last_block + 1}")
+
+    def poll(self):
+        """Process the blocks mined since the last poll. Returns the number of tokens refetched."""
+        head = self.w3.eth.block_number - self.confirmations
+        self.rollback()
+        from_block = self.last_block + 1
+        if from_block > head and not self.pending:
+            return 0
+
+        hashes, touched = {}, {}
+        if from_block <= head:
+            for number in range(max(from_block, head - self.reorg_depth + 1), head + 1):
+                hashes[number] = self._block_hash(number)
+            for log in get_logs_chunked(self.w3, self.contract.address, self.topics, from_block, head):
+                if log.get("removed"):
+                    continue
+                number = log["blockNumber"]
+                if number in hashes and _hex(log["blockHash"]) != hashes[number]:
+                    print(f"Block {number} changed while polling, retrying")
+                    return 0
+                touched.setdefault(number, set()).add(log_token_id(log))
+
+        token_ids = sorted(self.pending.union(*touched.values()))
+        if token_ids:
+            self.update_tokens(token_ids, max(head, self.last_block))
+        if hashes:
+            # The scraper's --incremental sync shares last_block and may have moved it back
+            self.blocks = [entry for entry in self.blocks if entry[0] < from_block]
+            self.blocks.extend([number, block_hash, sorted(touched.get(number, ()))]
+                               for number, block_hash in sorted(hashes.items()))
+            del self.blocks[:-self.reorg_depth]
+            self.last_block = head
+        self.store.set_meta("watch_blocks", self.blocks)
+        self.store.set_meta("refresh_pending", sorted(self.pending))
+        self.store.set_meta("last_block", self.last_block)
+        return len(token_ids)
+
+    def update_tokens(self, token_ids, block):
+        """Refetch and decode tokens at `block`, then update the store and, if a quote changed, the exports."""
+        token_uris, errors = fetch_token_uris(self.w3, self.contract, token_ids, block_identifier=block)
+        results = {}
+        self.pending = set()
+        for token_id in token_ids:
+            if token_id in errors and not is_revert_error(errors[token_id]):
+                self.pending.add(token_id)  # keep the previous result rather than storing an RPC failure
+                continue
+            if token_id in errors:
+                results[token_id] = {"token_id": token_id, "error": errors[token_id]}
+            else:
+                _, results[token_id] = self.decode(token_id, token_uri=token_uris[token_id])
+        self.store.put(results)
+
+        changed = 0
+        for token_id, result in results.items():
+            title = result_quote_title(result)
+            if self.titles.get(token_id) != title:
+                changed += 1
+                if title is None:
+                    del self.titles[token_id]
+                else:
+                    self.titles[token_id] = title
+        if changed:
+            self.write_exports()
+        print(f"Block {block}: refetched {len(results)} tokens, {changed} quote changes"
+              + (f", {len(self.pending)} to retry" if self.pending else ""))
+
+    def write_exports(self):
+        """Rewrite the quote mapping JSON and CSV from the in-memory titles (the whole collection)."""
+        rows = sorted(self.titles.items())
+        quote_mapping = {}
+        for token_id, title in rows:
+            quote_mapping.setdefault(title, []).append(token_id)
+        write_json_atomic(self.mapping_path, quote_mapping)
+        export(rows, {"csv": self.csv_path})
+
+    def run(self, interval=POLL_INTERVAL):
+        print(f"Watching from block {self.last_block + 1}, polling every {interval}s")
+        while True:
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Poll failed: {e}")
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep the results, quote mapping and CSV export up to date as new blocks arrive. "
+                    "Point RPC_URLS at a local dev chain (e.g. a mainnet fork) to test it.")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"Seconds between polls for new blocks (default: {POLL_INTERVAL})")
+    parser.add_argument("--from-block", type=int,
+                        help="Block to start from, overriding the saved sync state (default: the block after it, "
+                             "or the current head if there is none)")
+    parser.add_argument("--reorg-depth", type=int, default=REORG_DEPTH,
+                        help=f"Recent blocks kept to detect and roll back reorgs (default: {REORG_DEPTH})")
+    parser.add_argument("--confirmations", type=int, default=0,
+                        help="Stay this many blocks behind the head (default: 0)")
+    parser.add_argument("--stream-decode", action="store_true",
+                        help="Decode tokenURIs incrementally without materializing the embedded image")
+    parser.add_argument("--once", action="store_true", help="Poll once and exit")
+    args = parser.parse_args()
+
+    from get_buterin_token_uris import w3, contract, get_token_metadata, OUTPUT_FILE
+    from result_store import open_store, RESULTS_DB
+    from stream_decode import decode_token_uri_streaming
+
+    decode = decode_token_uri_streaming if args.stream_decode else get_token_metadata
+    with open_store(RESULTS_DB, OUTPUT_FILE) as store:
+        watcher = Watcher(w3, contract, store, decode, reorg_depth=args.reorg_depth,
+                          confirmations=args.confirmations)
+        if args.from_block is not None:
+            watcher.last_block = args.from_block - 1
+        elif watcher.last_block is None:
+            watcher.last_block = w3.eth.block_number - args.confirmations
+        if args.once:
+            watcher.poll()
+        else:
+            try:
+                watcher.run(args.interval)
+            except KeyboardInterrupt:
+                print(f"\nStopped at block {watcher.last_block}")